@@ -0,0 +1,166 @@
+# Compare les backends de base de données (PostgreSQL, SQLite WAL) sur les accès de LidSeek
+# Usage :
+#   python -m app.benchmarks.database_backends --url sqlite:////tmp/lidseek-bench.db --url postgresql+psycopg2://...
+#
+# La charge reproduit l'application : mise en file d'albums, transitions de statut des pistes
+# (écritures directes et flush du moniteur), interrogation du statut par la page album et
+# lectures du planificateur, avec des lecteurs web concurrents pendant les écritures.
+# Seules les lignes créées par le benchmark (identifiants préfixés) sont modifiées puis supprimées.
+import argparse
+import statistics
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app.db import create_db_engine
+from app.database import Database, DownloadStatus
+from app.migrate import run_migrations
+from app.models import Album, AlbumBlacklistSource, Artist, Base, Track
+from app.services.download_status_tracker import DownloadStatusTracker
+
+PREFIX = 'lidseek-bench-'
+
+class Timings:
+    def __init__(self):
+        self._durations = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, operation):
+        start = time.perf_counter()
+        yield
+        duration = time.perf_counter() - start
+        with self._lock:
+            self._durations[operation].append(duration)
+
+    def report(self):
+        rows = []
+        for operation, durations in sorted(self._durations.items()):
+            durations = sorted(durations)
+            p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+            rows.append((operation, len(durations), len(durations) / sum(durations), statistics.median(durations) * 1000, p99 * 1000))
+        return rows
+
+def album_records(albums, tracks):
+    return [
+        {
+            'id': f"{PREFIX}album-{a}",
+            'title': f"Album {a}",
+            'release_date': '2001-01-01',
+            'cover_url': None,
+            'priority': None,
+            'tracks': [
+                {
+                    'id': f"{PREFIX}track-{a}-{t}",
+                    'title': f"Track {t}",
+                    'position': str(t + 1),
+                    'length': 200000,
+                    'artist': 'Benchmark',
+                    'album_name': f"Album {a}",
+                    'track_num': str(t + 1),
+                    'disc': None,
+                    'year': '2001',
+                    'albumartist': 'Benchmark'
+                }
+                for t in range(tracks)
+            ]
+        }
+        for a in range(albums)
+    ]
+
+def cleanup(db):
+    session = db.session
+    album_ids = [row.id for row in session.query(Album.id).filter(Album.id.like(f"{PREFIX}%"))]
+    if album_ids:
+        session.query(AlbumBlacklistSource).filter(AlbumBlacklistSource.album_id.in_(album_ids)).delete(synchronize_session=False)
+        session.query(Track).filter(Track.album_id.in_(album_ids)).delete(synchronize_session=False)
+        session.query(Album).filter(Album.id.in_(album_ids)).delete(synchronize_session=False)
+    session.query(Artist).filter(Artist.id == f"{PREFIX}artist").delete(synchronize_session=False)
+    session.commit()
+    db.remove_session()
+
+def run_workload(url, albums, tracks, polls, readers):
+    engine = create_db_engine(url)
+    run_migrations(engine, Base.metadata)
+    sessions = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
+    db = Database(sessions)
+    tracker = DownloadStatusTracker(db)
+    timings = Timings()
+    records = album_records(albums, tracks)
+    cleanup(db)
+
+    started = time.perf_counter()
+    for record in records:
+        with timings.measure('queue album (upsert)'):
+            db.upsert_albums(f"{PREFIX}artist", 'Benchmark', [record])
+
+    stop = threading.Event()
+
+    def web_reader():
+        # Album page polling /album/<id>/status while downloads progress
+        i = 0
+        while not stop.is_set():
+            album_id = records[i % len(records)]['id']
+            with timings.measure('poll album status'):
+                db.get_album_status(album_id)
+            with timings.measure('poll tracks status'):
+                db.get_tracks_status(album_id)
+            db.remove_session()
+            i += 1
+
+    reader_threads = [threading.Thread(target=web_reader, daemon=True) for _ in range(readers)]
+    for thread in reader_threads:
+        thread.start()
+
+    for record in records:
+        with timings.measure('scheduler: pending albums'):
+            db.get_pending_albums()
+        for track in record['tracks']:
+            with timings.measure('enqueue track (direct write)'):
+                tracker.update_track_status(track['id'], DownloadStatus.PENDING, None, f"{track['id']}.flac")
+        db.update_album_status(record['id'], DownloadStatus.DOWNLOADING)
+
+        # Monitor ticks: read the tracks, stage transitions, flush once per tick
+        for status in (DownloadStatus.DOWNLOADING, DownloadStatus.COMPLETED):
+            with timings.measure('monitor tick (read + flush)'):
+                current = db.get_tracks_status(record['id'])
+                for track in record['tracks']:
+                    tracker.stage_track_status(track['id'], status, f"bench/{track['id']}.flac", f"{track['id']}.flac", current=current[track['id']])
+                tracker.flush()
+        db.remove_session()
+
+    for _ in range(polls):
+        for record in records:
+            with timings.measure('poll album status'):
+                db.get_album_status(record['id'])
+    with timings.measure('discography statuses'):
+        db.get_album_statuses([record['id'] for record in records])
+
+    stop.set()
+    for thread in reader_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    cleanup(db)
+    engine.dispose()
+    return elapsed, timings.report()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='app.benchmarks.database_backends', description="Benchmark des backends de base de données")
+    parser.add_argument('--url', action='append', required=True, help="URL SQLAlchemy à comparer (répétable)")
+    parser.add_argument('--albums', type=int, default=50)
+    parser.add_argument('--tracks', type=int, default=15, help="Pistes par album")
+    parser.add_argument('--polls', type=int, default=20, help="Interrogations du statut par album")
+    parser.add_argument('--readers', type=int, default=2, help="Threads web concurrents")
+    args = parser.parse_args(argv)
+
+    for url in args.url:
+        elapsed, rows = run_workload(url, args.albums, args.tracks, args.polls, args.readers)
+        print(f"\n{url.split('://')[0]}  ({args.albums} albums x {args.tracks} tracks, {args.readers} readers) : {elapsed:.2f}s")
+        print(f"{'operation':<32}{'count':>8}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+        for operation, count, ops, p50, p99 in rows:
+            print(f"{operation:<32}{count:>8}{ops:>12.0f}{p50:>10.2f}{p99:>10.2f}")
+
+if __name__ == "__main__":
+    main()
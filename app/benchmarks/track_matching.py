@@ -0,0 +1,249 @@
+# Mesure la précision et la vitesse de la correspondance pistes/fichiers, hors ligne
+# Usage :
+#   python -m app.benchmarks.track_matching
+#   python -m app.benchmarks.track_matching --similarity ratio --similarity ngram --ratio 0.4 --ratio 0.5 --ratio 0.6
+#   python -m app.benchmarks.track_matching --no-synthetic --fixtures mes_dossiers.json
+#
+# Le corpus mélange des albums synthétiques (générateur déterministe : styles de nommage Soulseek,
+# titres abîmés, pistes manquantes, versions live, éditions radio, bonus) et des dossiers de fixtures
+# JSON au format des réponses slskd. Chaque dossier indique le fichier attendu pour chaque piste,
+# ou null si le bon fichier est absent.
+#
+# fixtures/track_matching.json ne contient que quelques cas écrits à la main (pas des réponses
+# enregistrées) qui couvrent des pièges connus : trop peu pour comparer des backends. Les comparaisons
+# reposent sur le corpus synthétique, ou sur de vrais dossiers ajoutés avec --fixtures.
+#
+# Mesures par configuration (backend de similarité, ratio minimal, tolérance de durée) :
+#   matches/s     correspondances produites par seconde
+#   p50/p99 ms    latence de find_track_matches par album
+#   precision     correspondances justes / correspondances produites
+#   recall        correspondances justes / pistes dont le fichier est présent
+#   wrong-file    pistes associées à un autre fichier que l'attendu / pistes voulues
+# La sélection de dossier (CandidateRanker) est mesurée à part : part des albums dont le bon
+# dossier est classé premier parmi des éditions concurrentes.
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import time
+from app.services.candidate_ranker import CandidateRanker
+from app.services.similarity import SIMILARITY_BACKENDS, create_similarity
+from app.services.slsk_models import SlskDirectory, SlskFile, SlskSearchResult
+from app.services.track_matcher import TrackMatcher
+
+# Folder count below which fixture metrics are only a sanity check
+MIN_FIXTURE_ALBUMS = 50
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'track_matching.json')
+
+WORDS = [
+    'love', 'night', 'city', 'fire', 'dream', 'blue', 'heart', 'light', 'river', 'ghost', 'summer',
+    'electric', 'silence', 'golden', 'machine', 'shadow', 'ocean', 'broken', 'wild', 'song', 'dance',
+    'home', 'time', 'stars', 'rain', 'paper', 'glass', 'running', 'midnight', 'echo', 'señorita',
+    'café', 'été', 'cœur', 'lumière', "don't", "it's", 'rock', 'roll', 'one', 'two', 'more'
+]
+
+def _title(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(1, 4))]
+    title = ' '.join(w.capitalize() for w in words)
+    roll = rng.random()
+    if roll < 0.1:
+        title += f" (feat. {rng.choice(WORDS).capitalize()})"
+    elif roll < 0.15:
+        title += ', Pt. 2'
+    return title
+
+def _mangle(title, rng):
+    """Abîme un titre comme le font les noms de fichiers partagés."""
+    roll = rng.random()
+    if roll < 0.15:
+        title = title.lower().replace(' ', '_')
+    elif roll < 0.25:
+        title = ''.join(c for c in title if c.isalnum() or c == ' ')
+    elif roll < 0.3 and ' ' in title:
+        # Truncated long name
+        title = title.rsplit(' ', 1)[0]
+    return title
+
+NAMING_STYLES = [
+    lambda n, artist, album, title: f"{n:02d} - {title}",
+    lambda n, artist, album, title: f"{n:02d}. {artist} - {title}",
+    lambda n, artist, album, title: f"{artist} - {album} - {n:02d} - {title}",
+    lambda n, artist, album, title: f"{n:02d}-{artist.lower().replace(' ', '_')}-{title.lower().replace(' ', '_')}",
+    lambda n, artist, album, title: f"1{n:02d} {title}",
+    lambda n, artist, album, title: title
+]
+
+def _file(filename, length, extension):
+    return SlskFile(
+        filename=f"{filename}.{extension}",
+        size=length * (100_000 if extension == 'flac' else 40_000),
+        extension=extension,
+        attributes=[],
+        speed=0,
+        queue_length=0,
+        slots_free=True,
+        bit_rate=None if extension == 'flac' else 320,
+        length=length
+    )
+
+def synthetic_album(index, rng):
+    """Génère une tracklist MusicBrainz et un dossier Soulseek avec la vérité terrain."""
+    artist = f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}"
+    album = _title(rng)
+    tracks = [
+        {'id': f"synthetic-{index}-{i}", 'title': _title(rng), 'length': rng.randint(90, 420) * 1000}
+        for i in range(rng.randint(6, 18))
+    ]
+    style = rng.choice(NAMING_STYLES)
+    extension = rng.choice(['flac', 'mp3'])
+    files = []
+    expected = {}
+    for number, track in enumerate(tracks, start=1):
+        length = track['length'] // 1000 + rng.randint(-1, 1)
+        roll = rng.random()
+        if roll < 0.06:
+            # Missing track
+            expected[track['id']] = None
+            continue
+        if roll < 0.1:
+            # Only the radio edit is shared: same name, wrong file
+            files.append(_file(style(number, artist, album, f"{track['title']} (Radio Edit)"), max(length - rng.randint(40, 90), 60), extension))
+            expected[track['id']] = None
+            continue
+        file = _file(style(number, artist, album, _mangle(track['title'], rng)), length, extension)
+        files.append(file)
+        expected[track['id']] = file.filename
+        if rng.random() < 0.08:
+            # Live version shipped as a bonus next to the studio one
+            files.append(_file(style(len(tracks) + number, artist, album, f"{track['title']} (Live)"), length + rng.randint(20, 90), extension))
+
+    for extra in range(rng.choice([0, 0, 0, 1, 3])):
+        files.append(_file(style(len(tracks) * 2 + extra + 1, artist, album, _title(rng)), rng.randint(90, 420), extension))
+    files.append(SlskFile(filename='cover.jpg', size=300_000, extension='jpg', attributes=[], speed=0, queue_length=0, slots_free=True))
+    rng.shuffle(files)
+
+    directory = SlskDirectory(name=f"{artist}\\{album}", file_count=len(files), files=files)
+    return {'name': f"{artist} - {album}", 'tracks': tracks, 'directory': directory, 'expected': expected}
+
+def load_fixtures(path):
+    with open(path, encoding='utf-8') as f:
+        cases = json.load(f)
+    return [
+        {
+            'name': case['name'],
+            'tracks': case['tracks'],
+            'directory': SlskDirectory.from_response(case['directory']),
+            'expected': case['expected']
+        }
+        for case in cases
+    ]
+
+def run_matching(cases, matcher, allowed_extensions):
+    latencies = []
+    predicted = correct = wrong = present = wanted = 0
+    for case in cases:
+        start = time.perf_counter()
+        matches = matcher.find_matching_tracks(case['tracks'], case['directory'], allowed_extensions)
+        latencies.append(time.perf_counter() - start)
+
+        expected = case['expected']
+        wanted += len(expected)
+        present += sum(1 for filename in expected.values() if filename)
+        predicted += len(matches)
+        for track_id, file in matches.items():
+            if expected.get(track_id) == file.filename:
+                correct += 1
+            else:
+                wrong += 1
+
+    latencies.sort()
+    return {
+        'matches/s': predicted / sum(latencies) if latencies else 0.0,
+        'p50 ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+        'p99 ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0,
+        'precision': correct / predicted if predicted else 0.0,
+        'recall': correct / present if present else 0.0,
+        'wrong-file': wrong / wanted if wanted else 0.0
+    }
+
+def synthetic_search(case, rng):
+    """Résultats de recherche concurrents pour un album : le bon dossier et des éditions trompeuses."""
+    lengths = [t['length'] // 1000 for t in case['tracks']]
+    count = len(lengths)
+
+    def result(username, folder, folder_lengths, speed, queue_length):
+        files = [_file(f"@@music\\{folder}\\{i + 1:02d} - track", length, 'flac') for i, length in enumerate(folder_lengths)]
+        return SlskSearchResult(username, files, rng.random() < 0.5, speed, queue_length, True)
+
+    # Decoys are often better connected than the right source
+    results = [
+        result('right', 'album', lengths, rng.randint(100_000, 2_000_000), rng.randint(0, 20)),
+        result('live', 'album (live)', [length + rng.randint(30, 120) for length in lengths], rng.randint(1_000_000, 5_000_000), 0),
+        result('edit', 'album (radio edits)', [max(length - rng.randint(40, 90), 60) for length in lengths], rng.randint(1_000_000, 5_000_000), 0),
+        result('partial', 'album', lengths[:max(count // 2, 1)], rng.randint(1_000_000, 5_000_000), 0)
+    ]
+    rng.shuffle(results)
+    return results
+
+def run_folder_selection(cases, ranker, rng):
+    latencies = []
+    top = 0
+    for case in cases:
+        results = synthetic_search(case, rng)
+        wanted_length = sum(t['length'] for t in case['tracks']) / 1000
+        start = time.perf_counter()
+        ranked = ranker.rank(results, len(case['tracks']), ['flac'], wanted_length)
+        latencies.append(time.perf_counter() - start)
+        if ranked and ranked[0].username == 'right':
+            top += 1
+    return top / len(cases) if cases else 0.0, statistics.median(latencies) * 1000 if latencies else 0.0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='app.benchmarks.track_matching', description="Benchmark de la correspondance pistes/fichiers")
+    parser.add_argument('--similarity', action='append', choices=sorted(SIMILARITY_BACKENDS), help="Backend de similarité (répétable, ratio par défaut)")
+    parser.add_argument('--ratio', action='append', type=float, help="Ratio minimal (répétable, 0.5 par défaut)")
+    parser.add_argument('--duration-tolerance', action='append', type=float, help="Tolérance de durée en secondes (répétable, 10 par défaut, 0 pour l'ignorer)")
+    parser.add_argument('--runtime-tolerance', type=float, default=0.1, help="Tolérance de durée totale des dossiers")
+    parser.add_argument('--albums', type=int, default=300, help="Albums synthétiques")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--fixtures', action='append', help="Fichier JSON de dossiers (répétable, cas écrits à la main par défaut)")
+    parser.add_argument('--no-synthetic', action='store_true', help="Uniquement les dossiers des fixtures")
+    parser.add_argument('--extensions', default='mp3,flac', help="Extensions autorisées")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    synthetic = [] if args.no_synthetic else [synthetic_album(i, rng) for i in range(args.albums)]
+    fixtures = [case for path in (args.fixtures or [FIXTURES]) for case in load_fixtures(path)]
+    corpora = [('synthetic', synthetic), ('fixtures', fixtures)]
+    allowed_extensions = args.extensions.split(',')
+
+    columns = ['matches/s', 'p50 ms', 'p99 ms', 'precision', 'recall', 'wrong-file']
+    print(f"{'corpus':<11}{'similarity':<12}{'ratio':>6}{'dur s':>7}{'albums':>8}" + ''.join(f"{c:>12}" for c in columns))
+    for similarity in args.similarity or ['ratio']:
+        for ratio in args.ratio or [0.5]:
+            for tolerance in args.duration_tolerance or [10.0]:
+                matcher = TrackMatcher(ratio, create_similarity(similarity), tolerance)
+                # Per-match logging would dominate the timings
+                matcher.logger.setLevel(logging.ERROR)
+                for corpus, cases in corpora:
+                    if not cases:
+                        continue
+                    metrics = run_matching(cases, matcher, allowed_extensions)
+                    print(f"{corpus:<11}{similarity:<12}{ratio:>6.2f}{tolerance:>7.0f}{len(cases):>8}"
+                          f"{metrics['matches/s']:>12.0f}{metrics['p50 ms']:>12.2f}{metrics['p99 ms']:>12.2f}"
+                          f"{metrics['precision']:>12.3f}{metrics['recall']:>12.3f}{metrics['wrong-file']:>12.3f}")
+
+    if 0 < len(fixtures) < MIN_FIXTURE_ALBUMS:
+        print(f"\nfixtures: only {len(fixtures)} albums, too few to compare backends or ratios")
+
+    if synthetic:
+        ranker = CandidateRanker(runtime_tolerance=args.runtime_tolerance)
+        ranker.logger.setLevel(logging.ERROR)
+        accuracy, p50 = run_folder_selection(synthetic, ranker, rng)
+        print(f"\nfolder selection: right folder ranked first for {accuracy:.1%} of {len(synthetic)} albums (p50 {p50:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
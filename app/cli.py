@@ -0,0 +1,84 @@
+# Commandes en ligne pour LidSeek
+# Usage :
+#   python -m app.cli queue-artist <artist_mbid> [--primary-type album] [--secondary-type live] [--priority 10]
+#   python -m app.cli queue-albums <artist_mbid> <release_group_id> [<release_group_id> ...] [--priority 10]
+#   python -m app.cli repair-album-counters [<album_id> ...]
+import argparse
+import json
+import sys
+import redis
+from app.config.settings import Config
+from app.database import Database
+from app.services.musicbrainz import MusicBrainzService
+from app.services.download_manager import DownloadManager
+from app.services.discography_queue import DiscographyQueueService
+
+def build_discography_queue():
+    redis_client = redis.Redis(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        decode_responses=True
+    )
+    musicbrainz_service = MusicBrainzService(
+        Config.USER_AGENT,
+        redis_client,
+        Config.CACHE_EXPIRATION
+    )
+    # Albums are only written as pending, the running app's scheduler downloads them
+    download_manager = DownloadManager(Database())
+    return DiscographyQueueService(
+        musicbrainz_service,
+        download_manager,
+        Config.MUSICBRAINZ_MAX_CONCURRENT_REQUESTS
+    )
+
+def repair_album_counters(album_ids=None):
+    db = Database()
+    try:
+        count = db.recount_album_progress(album_ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    print(f"Compteurs recalculés pour {count} albums")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='app.cli', description="Commandes LidSeek")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    artist_parser = subparsers.add_parser('queue-artist', help="Ajoute la discographie d'un artiste à la file")
+    artist_parser.add_argument('artist_id', help="MBID de l'artiste")
+    artist_parser.add_argument('--primary-type', action='append', default=[], help="Type principal (album, ep, single, ...)")
+    artist_parser.add_argument('--secondary-type', action='append', default=[], help="Type secondaire (live, compilation, ...)")
+    artist_parser.add_argument('--priority', type=int, default=None)
+
+    albums_parser = subparsers.add_parser('queue-albums', help="Ajoute une liste d'albums d'un artiste à la file")
+    albums_parser.add_argument('artist_id', help="MBID de l'artiste")
+    albums_parser.add_argument('album_ids', nargs='+', help="MBID des release groups")
+    albums_parser.add_argument('--priority', type=int, default=None)
+
+    repair_parser = subparsers.add_parser('repair-album-counters', help="Recalcule le nombre de pistes totales et terminées des albums")
+    repair_parser.add_argument('album_ids', nargs='*', help="MBID des albums (tous par défaut)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'repair-album-counters':
+        return repair_album_counters(args.album_ids or None)
+
+    discography_queue = build_discography_queue()
+
+    if args.command == 'queue-artist':
+        result = discography_queue.queue_artist(
+            args.artist_id,
+            primary_types=args.primary_type,
+            secondary_types=args.secondary_type,
+            priority=args.priority
+        )
+    else:
+        result = discography_queue.queue_release_groups(args.artist_id, args.album_ids, args.priority)
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 1 if result['failed'] and not result['queued'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,8 @@ load_dotenv()
 class Config:
     USER_AGENT = f"{os.getenv('USER_AGENT_NAME')}/{os.getenv('USER_AGENT_VERSION')} ({os.getenv('USER_AGENT_EMAIL')})"
     CACHE_EXPIRATION = 24 * 60 * 60  # 24 hours in seconds
+    LIBRARY_PAGE_SIZE = int(os.getenv('LIBRARY_PAGE_SIZE', '100'))  # albums per library page
+    MUSICBRAINZ_MAX_CONCURRENT_REQUESTS = int(os.getenv('MUSICBRAINZ_MAX_CONCURRENT_REQUESTS', '2'))
     REDIS_HOST = 'redis'
     REDIS_PORT = 6379
     FLASK_PORT = 8081
@@ -13,6 +15,12 @@ class Config:
     
     # Download check interval (in seconds)
     DOWNLOAD_CHECK_INTERVAL = int(os.getenv('DOWNLOAD_CHECK_INTERVAL', '5'))
+    # Fallback check interval when nothing is downloading (in seconds)
+    DOWNLOAD_IDLE_CHECK_INTERVAL = int(os.getenv('DOWNLOAD_IDLE_CHECK_INTERVAL', '60'))
+    # Delay to group bursts of download events (in seconds)
+    DOWNLOAD_EVENT_DEBOUNCE = float(os.getenv('DOWNLOAD_EVENT_DEBOUNCE', '0.25'))
+    # Watch the download folder for finished files
+    DOWNLOAD_EVENTS_WATCH_DIR = os.getenv('DOWNLOAD_EVENTS_WATCH_DIR', 'true').lower() == 'true'
     
     # Slskd configuration
     SLSKD_HOST = os.getenv('SLSKD_HOST', 'http://slskd:5030')
@@ -22,6 +30,42 @@ class Config:
     SLSKD_ALLOWED_FILETYPES = os.getenv('SLSKD_ALLOWED_FILETYPES', 'mp3,flac').split(',')
     SLSKD_IGNORED_USERS = os.getenv('SLSKD_IGNORED_USERS', '').split(',')
     SLSKD_MIN_MATCH_RATIO = float(os.getenv('SLSKD_MIN_MATCH_RATIO', '0.5'))
+    # Track/file similarity: 'ratio' (difflib, the scale of SLSKD_MIN_MATCH_RATIO) or 'ngram' (character trigram cosine)
+    TRACK_MATCH_SIMILARITY = os.getenv('TRACK_MATCH_SIMILARITY', 'ratio')
+    # Maximum duration gap between a track and a file (in seconds, 0 to ignore durations)
+    TRACK_MATCH_DURATION_TOLERANCE = float(os.getenv('TRACK_MATCH_DURATION_TOLERANCE', '10'))
+    SLSKD_SEARCH_POLL_INTERVAL = float(os.getenv('SLSKD_SEARCH_POLL_INTERVAL', '0.5'))  # in seconds
+    SLSKD_SEARCH_CACHE_EXPIRATION = int(os.getenv('SLSKD_SEARCH_CACHE_EXPIRATION', '3600'))  # in seconds
+    # How long the ranked sources of an album are kept for retries (in seconds)
+    SLSKD_CANDIDATE_EXPIRATION = int(os.getenv('SLSKD_CANDIDATE_EXPIRATION', '86400'))
+    # Shared secret expected in the X-API-Key header of slskd webhooks
+    SLSKD_WEBHOOK_API_KEY = os.getenv('SLSKD_WEBHOOK_API_KEY', '')
+
+    # Download scheduling: maximum albums downloading at once (0 for no limit)
+    MAX_CONCURRENT_ALBUM_DOWNLOADS = int(os.getenv('MAX_CONCURRENT_ALBUM_DOWNLOADS', '10'))
+    MAX_CONCURRENT_ALBUM_DOWNLOADS_PER_PEER = int(os.getenv('MAX_CONCURRENT_ALBUM_DOWNLOADS_PER_PEER', '2'))
+
+    # Concurrent album search configuration
+    SLSKD_MAX_CONCURRENT_SEARCHES = int(os.getenv('SLSKD_MAX_CONCURRENT_SEARCHES', '4'))
+    SLSKD_MAX_CONCURRENT_BROWSES = int(os.getenv('SLSKD_MAX_CONCURRENT_BROWSES', '8'))
+    SLSKD_MAX_BROWSES_PER_PEER = int(os.getenv('SLSKD_MAX_BROWSES_PER_PEER', '1'))
+    SLSKD_BROWSE_TIMEOUT = float(os.getenv('SLSKD_BROWSE_TIMEOUT', '15'))
+
+    # Search result ranking: only the best ranked folders are browsed
+    SLSKD_MAX_BROWSED_CANDIDATES = int(os.getenv('SLSKD_MAX_BROWSED_CANDIDATES', '5'))
+    # Alternate sources to find before browsing stops at a complete folder (used for failover)
+    SLSKD_FAILOVER_SOURCES = int(os.getenv('SLSKD_FAILOVER_SOURCES', '2'))
+    # Folders whose total runtime differs from the album's by more than this share are rejected
+    SLSKD_RUNTIME_TOLERANCE = float(os.getenv('SLSKD_RUNTIME_TOLERANCE', '0.1'))
+    SLSKD_RANKING_WEIGHTS = {
+        'file_count': float(os.getenv('SLSKD_RANK_WEIGHT_FILE_COUNT', '4')),
+        'extension': float(os.getenv('SLSKD_RANK_WEIGHT_EXTENSION', '1')),
+        'bitrate': float(os.getenv('SLSKD_RANK_WEIGHT_BITRATE', '1')),
+        'upload_speed': float(os.getenv('SLSKD_RANK_WEIGHT_UPLOAD_SPEED', '1')),
+        'queue_length': float(os.getenv('SLSKD_RANK_WEIGHT_QUEUE_LENGTH', '1')),
+        'free_upload_slots': float(os.getenv('SLSKD_RANK_WEIGHT_FREE_UPLOAD_SLOTS', '1')),
+        'duration': float(os.getenv('SLSKD_RANK_WEIGHT_DURATION', '1'))
+    }
     
     # Destination folder configuration
     FORMATTED_SONGS_DIR = os.getenv('FORMATTED_SONGS_DIR', '/formatted_songs')
\ No newline at end of file
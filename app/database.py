@@ -1,8 +1,10 @@
-from datetime import datetime
+import json
+from sqlalchemy import case, func, or_, select, update
+from datetime import datetime, timedelta
 from enum import Enum
-from app.db import SessionLocal
+from app.db import Session
 from app.utils.logger import setup_logger
-from app.models import Artist, Album, Track, AlbumBlacklistSource
+from app.models import Artist, Album, Track, AlbumBlacklistSource, AlbumSourceCandidate, PeerStat
 
 class DownloadStatus(Enum):
     PENDING = "pending"
@@ -11,10 +13,20 @@ class DownloadStatus(Enum):
     ERROR = "error"
 
 class Database:
-    def __init__(self):
-        self.session = SessionLocal()
+    def __init__(self, session_registry=None):
+        # session_registry : scoped_session à utiliser, celle de l'application par défaut
+        self._sessions = session_registry or Session
         self.logger = setup_logger('database', 'database.log')
 
+    @property
+    def session(self):
+        # Session propre au thread courant
+        return self._sessions()
+
+    def remove_session(self):
+        # Ferme la session du thread courant et vide son identity map
+        self._sessions.remove()
+
     def add_artist(self, artist_id, name):
         artist = self.session.get(Artist, artist_id)
         if artist:
@@ -71,9 +83,90 @@ class Database:
                 self.logger.error(f"add_track: Invalid type passed to session.add: {type(track_obj)} value={track_obj}")
                 raise TypeError(f"add_track: Expected SQLAlchemy model instance, got {type(track_obj)}")
             self.session.add(track_obj)
+            self.session.flush()
+            self.recount_album_progress([album_id])
         self.session.commit()
         self.logger.info(f"add_track: committed for id={track_id}")
 
+    def upsert_albums(self, artist_id, artist_name, albums, keep_statuses=()):
+        # Ajoute ou met à jour l'artiste, les albums (remis en attente) et leurs pistes en une seule transaction
+        # albums : liste de dicts id, title, release_date, cover_url, priority, tracks[]
+        # keep_statuses : statuts d'album existants qui ne sont pas remis en attente
+        album_rows = []
+        track_rows = []
+        for album in albums:
+            album_row = {
+                'id': album['id'],
+                'artist_id': artist_id,
+                'title': album['title'],
+                'release_date': album.get('release_date'),
+                'cover_url': album.get('cover_url'),
+                'status': DownloadStatus.PENDING.value
+            }
+            if album.get('priority') is not None:
+                album_row['priority'] = album['priority']
+            album_rows.append(album_row)
+            for track in album['tracks']:
+                track_rows.append({
+                    'id': track['id'],
+                    'album_id': album['id'],
+                    'title': track['title'],
+                    'position': track.get('position'),
+                    'length': track.get('length'),
+                    'artist': track.get('artist'),
+                    'album_name': track.get('album_name'),
+                    'track': track.get('track_num'),
+                    'disc': track.get('disc'),
+                    'year': track.get('year'),
+                    'albumartist': track.get('albumartist')
+                })
+
+        # A row may only be upserted once per statement
+        album_rows = list({row['id']: row for row in album_rows}.values())
+        track_rows = list({row['id']: row for row in track_rows}.values())
+
+        try:
+            self._upsert(Artist, [{'id': artist_id, 'name': artist_name}], ['name'])
+            # Priority is only overwritten when given, for every album of the batch
+            with_priority = [row for row in album_rows if 'priority' in row]
+            without_priority = [row for row in album_rows if 'priority' not in row]
+            album_columns = ['title', 'release_date', 'cover_url', 'status']
+            keep = [status.value for status in keep_statuses]
+            self._upsert(Album, with_priority, album_columns + ['priority'], keep)
+            self._upsert(Album, without_priority, album_columns, keep)
+            # Track status is kept, as add_track does
+            self._upsert(Track, track_rows, ['title', 'position', 'length', 'artist', 'album_name', 'track', 'disc', 'year', 'albumartist'])
+            self.recount_album_progress([row['id'] for row in album_rows])
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        self.logger.info(f"upsert_albums: committed {len(album_rows)} albums and {len(track_rows)} tracks for artist id={artist_id}")
+
+    def _upsert(self, model, rows, update_columns, keep_statuses=()):
+        # INSERT ... ON CONFLICT (clé primaire) DO UPDATE des colonnes données, sans commit
+        # keep_statuses : valeurs de la colonne status conservées sur les lignes existantes
+        if not rows:
+            return
+        dialect = self.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise NotImplementedError(f"Upsert not supported for dialect {dialect}")
+        stmt = insert(model)
+        set_ = {column: stmt.excluded[column] for column in update_columns}
+        if keep_statuses and 'status' in set_:
+            # Equalities rather than IN: expanding parameters are not allowed with executemany
+            kept = or_(*[model.status == status for status in keep_statuses])
+            set_['status'] = case((kept, model.status), else_=stmt.excluded.status)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[column.name for column in model.__table__.primary_key.columns],
+            set_=set_
+        )
+        self.session.execute(stmt, rows)
+
     def add_blacklisted_source(self, album_id, username):
         bl = self.session.query(AlbumBlacklistSource).filter_by(album_id=album_id, username=username).first()
         if not bl:
@@ -88,12 +181,130 @@ class Database:
     def get_blacklisted_sources(self, album_id):
         return [bl.username for bl in self.session.query(AlbumBlacklistSource).filter_by(album_id=album_id).all()]
 
+    def save_source_candidates(self, album_id, candidates, expiration):
+        # Remplace les sources classées d'un album ; candidates : liste de dicts username, directory, score, files
+        # Rien n'est écrit si elles n'ont pas changé, et une source encore valide garde son expiration
+        now = datetime.utcnow()
+        existing = {
+            (row.username, row.directory): row
+            for row in self.session.query(AlbumSourceCandidate).filter_by(album_id=album_id)
+            if row.expiration_date > now
+        }
+        unchanged = len(existing) == len(candidates) and all(
+            self._same_candidate(existing.get((candidate['username'], candidate['directory'])), rank, candidate)
+            for rank, candidate in enumerate(candidates)
+        )
+        if unchanged:
+            return False
+
+        self.session.query(AlbumSourceCandidate).filter_by(album_id=album_id).delete()
+        expiration_date = now + timedelta(seconds=expiration)
+        for rank, candidate in enumerate(candidates):
+            known = existing.get((candidate['username'], candidate['directory']))
+            self.session.add(AlbumSourceCandidate(
+                album_id=album_id,
+                username=candidate['username'],
+                directory=candidate['directory'],
+                rank=rank,
+                score=candidate['score'],
+                queue_length=candidate.get('queue_length', 0),
+                files=json.dumps(candidate['files']),
+                expiration_date=known.expiration_date if known else expiration_date
+            ))
+        self.session.commit()
+        return True
+
+    def _same_candidate(self, row, rank, candidate):
+        return (
+            row is not None
+            and row.rank == rank
+            and row.score == candidate['score']
+            and (row.queue_length or 0) == (candidate.get('queue_length') or 0)
+            and json.loads(row.files) == candidate['files']
+        )
+
+    def get_source_candidates(self, album_id):
+        # Retourne les sources non expirées d'un album, de la meilleure à la moins bonne
+        rows = (
+            self.session.query(AlbumSourceCandidate)
+            .filter(AlbumSourceCandidate.album_id == album_id)
+            .filter(AlbumSourceCandidate.expiration_date > datetime.utcnow())
+            .order_by(AlbumSourceCandidate.rank)
+            .all()
+        )
+        return [
+            {
+                'username': row.username,
+                'directory': row.directory,
+                'score': row.score,
+                'queue_length': row.queue_length or 0,
+                'files': json.loads(row.files)
+            }
+            for row in rows
+        ]
+
+    def get_peer_stats(self, usernames):
+        # Retourne les statistiques connues des pairs, indexées par nom d'utilisateur
+        if not usernames:
+            return {}
+        rows = self.session.query(PeerStat).filter(PeerStat.username.in_(list(usernames))).all()
+        return {
+            row.username: {
+                'completed_count': row.completed_count or 0,
+                'error_count': row.error_count or 0,
+                'bytes_downloaded': row.bytes_downloaded or 0,
+                'avg_speed': row.avg_speed,
+                'avg_ttfb': row.avg_ttfb,
+                'last_transfer_end': row.last_transfer_end,
+                'last_seen': row.last_seen
+            }
+            for row in rows
+        }
+
+    def save_peer_stats(self, stats):
+        # Enregistre les statistiques de plusieurs pairs en une seule transaction
+        try:
+            for username, values in stats.items():
+                self.session.merge(PeerStat(username=username, **values))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def remove_source_candidate_track(self, album_id, username, directory, track_id):
+        # Retire une piste des fichiers proposés par une source
+        row = self.session.get(AlbumSourceCandidate, (album_id, username, directory))
+        if not row:
+            return
+        files = json.loads(row.files)
+        if files.pop(track_id, None) is not None:
+            row.files = json.dumps(files)
+            self.session.commit()
+
+    def delete_source_candidates(self, album_id=None):
+        # Supprime les sources d'un album, ou toutes les sources expirées si album_id est absent
+        q = self.session.query(AlbumSourceCandidate)
+        if album_id:
+            q = q.filter(AlbumSourceCandidate.album_id == album_id)
+        else:
+            q = q.filter(AlbumSourceCandidate.expiration_date <= datetime.utcnow())
+        q.delete()
+        self.session.commit()
+
     def set_album_source_username(self, album_id, username):
         album = self.session.get(Album, album_id)
         if album:
             album.source_username = username
             self.session.commit()
 
+    def set_album_priority(self, album_id, priority):
+        album = self.session.get(Album, album_id)
+        if not album:
+            return False
+        album.priority = priority
+        self.session.commit()
+        return True
+
     def get_album_source_username(self, album_id):
         album = self.session.get(Album, album_id)
         return album.source_username if album and album.source_username else None
@@ -102,6 +313,7 @@ class Database:
         track = self.session.get(Track, track_id)
         if not track:
             return
+        self._count_completed_transition(track.album_id, track.status, status)
         track.status = status.value
         if status == DownloadStatus.COMPLETED:
             track.download_date = datetime.now()
@@ -111,6 +323,53 @@ class Database:
             track.slsk_id = slsk_id
         self.session.commit()
 
+    def apply_status_changes(self, track_changes, album_changes):
+        # Applique en une seule transaction des changements de statut
+        # track_changes : {track_id: (status, local_path, slsk_id)}, album_changes : {album_id: status}
+        try:
+            tracks = self.session.query(Track).filter(Track.id.in_(list(track_changes))).all() if track_changes else []
+            for track in tracks:
+                status, local_path, slsk_id = track_changes[track.id]
+                self._count_completed_transition(track.album_id, track.status, status)
+                track.status = status.value
+                track.slsk_id = slsk_id
+                if status == DownloadStatus.COMPLETED:
+                    track.download_date = datetime.now()
+                    track.local_path = local_path
+            albums = self.session.query(Album).filter(Album.id.in_(list(album_changes))).all() if album_changes else []
+            for album in albums:
+                status = album_changes[album.id]
+                album.status = status.value
+                if status == DownloadStatus.COMPLETED:
+                    album.download_date = datetime.now()
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def _count_completed_transition(self, album_id, old_status, new_status):
+        # Met à jour le compteur de pistes terminées de l'album, dans la transaction en cours
+        delta = (new_status == DownloadStatus.COMPLETED) - (old_status == DownloadStatus.COMPLETED.value)
+        if delta:
+            self.session.query(Album).filter(Album.id == album_id).update(
+                {Album.completed_tracks: Album.completed_tracks + delta},
+                synchronize_session=False
+            )
+
+    def recount_album_progress(self, album_ids=None):
+        # Recalcule total_tracks et completed_tracks à partir des pistes, pour les albums donnés ou tous
+        # Retourne le nombre d'albums mis à jour (sans commit si appelé dans une transaction en cours)
+        stmt = update(Album).values(
+            total_tracks=select(func.count(Track.id)).where(Track.album_id == Album.id).scalar_subquery(),
+            completed_tracks=select(func.count(Track.id)).where(
+                Track.album_id == Album.id,
+                Track.status == DownloadStatus.COMPLETED.value
+            ).scalar_subquery()
+        )
+        if album_ids is not None:
+            stmt = stmt.where(Album.id.in_(list(album_ids)))
+        return self.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
     def update_album_status(self, album_id, status):
         album = self.session.get(Album, album_id)
         if not album:
@@ -132,13 +391,13 @@ class Database:
         return q.all()
 
     def get_pending_albums(self):
-        # Retourne une liste de dicts avec id, title, artist_name, artist_id, tracks[]
+        # Retourne une liste de dicts avec id, title, artist_name, artist_id, priority, tracks[], par priorité décroissante
         q = (
             self.session.query(Album, Artist, Track)
             .join(Artist, Album.artist_id == Artist.id)
             .join(Track, Album.id == Track.album_id)
             .filter(Album.status == DownloadStatus.PENDING.value)
-            .order_by(Album.added_date, Track.position)
+            .order_by(Album.priority.desc(), Album.added_date, Track.position)
         )
         albums = {}
         for album, artist, track in q:
@@ -148,17 +407,19 @@ class Database:
                     'title': album.title,
                     'artist_name': artist.name,
                     'artist_id': artist.id,
+                    'priority': album.priority,
                     'tracks': []
                 }
             albums[album.id]['tracks'].append({
                 'id': track.id,
                 'title': track.title,
-                'position': track.position
+                'position': track.position,
+                'length': track.length
             })
         return list(albums.values())
 
     def get_downloading_albums(self):
-        # Retourne une liste de dicts avec id, title, artist_id, release_date, artist_name
+        # Retourne une liste de dicts avec id, title, artist_id, release_date, artist_name, source_username, status
         q = (
             self.session.query(Album, Artist)
             .join(Artist, Album.artist_id == Artist.id)
@@ -170,7 +431,9 @@ class Database:
                 'title': album.title,
                 'artist_id': album.artist_id,
                 'release_date': album.release_date,
-                'artist_name': artist.name
+                'artist_name': artist.name,
+                'source_username': album.source_username,
+                'status': album.status
             }
             for album, artist in q
         ]
@@ -180,9 +443,22 @@ class Database:
         album = self.session.get(Album, album_id)
         if not album:
             return None
-        total_tracks = len(album.tracks)
-        completed_tracks = sum(1 for t in album.tracks if t.status == DownloadStatus.COMPLETED.value)
-        return (album.id, album.title, album.status, total_tracks, completed_tracks)
+        return (album.id, album.title, album.status, album.total_tracks, album.completed_tracks)
+
+    def get_album_statuses(self, album_ids, chunk_size=500):
+        # Retourne {album_id: (id, title, status, total_tracks, completed_tracks)} pour les albums connus,
+        # avec une requête par paquet de chunk_size identifiants
+        album_ids = list(dict.fromkeys(album_ids))
+        statuses = {}
+        for start in range(0, len(album_ids), chunk_size):
+            rows = (
+                self.session.query(Album.id, Album.title, Album.status, Album.total_tracks, Album.completed_tracks)
+                .filter(Album.id.in_(album_ids[start:start + chunk_size]))
+                .all()
+            )
+            for album_id, title, status, total_tracks, completed_tracks in rows:
+                statuses[album_id] = (album_id, title, status, total_tracks, completed_tracks)
+        return statuses
 
     def get_tracks_status(self, album_id):
         # Retourne {track_id: {status, local_path, position, title, slsk_id}}
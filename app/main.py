@@ -2,6 +2,7 @@ import time
 from sqlalchemy.exc import OperationalError
 from app.db import engine
 from app.models import Base
+from app.migrate import run_migrations
 import redis
 import os
 from flask import Flask, render_template
@@ -11,24 +12,30 @@ from app.services.musicbrainz import MusicBrainzService
 from app.services.download_manager import DownloadManager
 from app.services.downloaders import SlskdDownloader
 from app.services.library import LibraryService
+from app.services.discography_queue import DiscographyQueueService
+from app.services.search_cache import SearchResultCache
 from app.services.background_task_manager import BackgroundTaskManager
+from app.services.download_events import DownloadDirectoryWatcher
 from app.routes.album_routes import album_routes, init_routes as init_album_routes
 from app.routes.download_routes import download_routes, init_routes as init_download_routes
 from app.routes.library_routes import library_routes, init_routes as init_library_routes
+from app.routes.event_routes import event_routes, init_routes as init_event_routes
 import atexit
 
 def create_app():
     # Initialise la base de données (crée les tables si besoin) avec retry si Postgres n'est pas prêt
-    max_retries = 15
+    # SQLite est embarqué : pas d'attente
+    max_retries = 1 if engine.dialect.name == 'sqlite' else 15
     for attempt in range(max_retries):
         try:
-            Base.metadata.create_all(bind=engine)
+            # Tables are created under the migration lock, several workers may start together
+            run_migrations(engine, Base.metadata)
             break
         except OperationalError as e:
+            if attempt + 1 == max_retries:
+                raise RuntimeError("Impossible de se connecter à la base de données après plusieurs tentatives.") from e
             print(f"[DB INIT] Tentative {attempt+1}/{max_retries} : Base non disponible, attente...")
             time.sleep(2)
-    else:
-        raise RuntimeError("Impossible de se connecter à la base de données après plusieurs tentatives.")
     app = Flask(__name__)
     
     # Initialize services
@@ -56,23 +63,53 @@ def create_app():
     slskd_downloader.allowed_filetypes = Config.SLSKD_ALLOWED_FILETYPES
     slskd_downloader.ignored_users = Config.SLSKD_IGNORED_USERS
     slskd_downloader.minimum_match_ratio = Config.SLSKD_MIN_MATCH_RATIO
+    slskd_downloader.search_poll_interval = Config.SLSKD_SEARCH_POLL_INTERVAL
+    slskd_downloader.search_cache = SearchResultCache(redis_client, Config.SLSKD_SEARCH_CACHE_EXPIRATION)
     
     download_manager.configure_downloader(slskd_downloader)
     download_manager.download_dir = Config.SLSKD_DOWNLOAD_DIR
+    discography_queue = DiscographyQueueService(
+        musicbrainz_service,
+        download_manager,
+        Config.MUSICBRAINZ_MAX_CONCURRENT_REQUESTS
+    )
     
     library_service = LibraryService(db)
 
     # Initialize and start the background task manager
     background_task_manager = BackgroundTaskManager()
-    background_task_manager.start_download_monitor(download_manager, interval=Config.DOWNLOAD_CHECK_INTERVAL)
+    background_task_manager.start_download_monitor(
+        download_manager,
+        interval=Config.DOWNLOAD_CHECK_INTERVAL,
+        idle_interval=Config.DOWNLOAD_IDLE_CHECK_INTERVAL,
+        debounce=Config.DOWNLOAD_EVENT_DEBOUNCE
+    )
+
+    background_task_manager.start_download_scheduler(download_manager, interval=Config.DOWNLOAD_IDLE_CHECK_INTERVAL)
 
     # Register the clean shutdown function
     atexit.register(background_task_manager.stop_all)
 
+    # Wake the download monitor when slskd writes finished files
+    if Config.DOWNLOAD_EVENTS_WATCH_DIR:
+        download_watcher = DownloadDirectoryWatcher(
+            download_manager.events,
+            Config.SLSKD_DOWNLOAD_DIR,
+            Config.SLSKD_ALLOWED_FILETYPES
+        )
+        if download_watcher.start():
+            atexit.register(download_watcher.stop)
+
     # Register routes
     app.register_blueprint(init_album_routes(musicbrainz_service, download_manager))
-    app.register_blueprint(init_download_routes(musicbrainz_service, download_manager))
+    app.register_blueprint(init_download_routes(musicbrainz_service, download_manager, discography_queue))
     app.register_blueprint(init_library_routes(library_service))
+    app.register_blueprint(init_event_routes(download_manager.events))
+
+    @app.teardown_appcontext
+    def remove_db_session(exception=None):
+        # Release the request thread's session and its identity map
+        db.remove_session()
 
     @app.route('/')
     def index():
@@ -1,58 +1,179 @@
-import sqlite3
-import os
+# Migrations du schéma, appliquées au démarrage par run_migrations(engine, Base.metadata)
+# create_all crée les tables manquantes ; les migrations mettent à niveau les tables existantes.
+# Chaque opération vérifie le schéma existant (inspector) et retourne False si elle
+# n'a rien à faire : elles sont rejouables et fonctionnent avec PostgreSQL comme avec SQLite.
+# Les requêtes RunSQL doivent rester portables entre les deux.
+from datetime import datetime
+import threading
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+class AddColumn:
+    def __init__(self, table, column):
+        self.table = table
+        self.column = column
+
+    def apply(self, connection):
+        inspector = inspect(connection)
+        if not inspector.has_table(self.table):
+            return False
+        if self.column.name in [c['name'] for c in inspector.get_columns(self.table)]:
+            return False
+        ddl = f"ALTER TABLE {self.table} ADD COLUMN {self.column.name} {self.column.type.compile(dialect=connection.dialect)}"
+        if self.column.server_default is not None:
+            ddl += f" DEFAULT {self.column.server_default.arg}"
+        if not self.column.nullable:
+            ddl += " NOT NULL"
+        connection.execute(text(ddl))
+        return True
+
+    def __str__(self):
+        return f"add column {self.table}.{self.column.name}"
+
+class RunSQL:
+    def __init__(self, sql, description):
+        self.sql = sql
+        self.description = description
+
+    def apply(self, connection):
+        connection.execute(text(self.sql))
+        return True
+
+    def __str__(self):
+        return self.description
+
+class CreateIndex:
+    def __init__(self, name, table, columns):
+        self.name = name
+        self.table = table
+        self.columns = columns
+
+    def apply(self, connection):
+        inspector = inspect(connection)
+        if not inspector.has_table(self.table):
+            return False
+        if self.name in [index['name'] for index in inspector.get_indexes(self.table)]:
+            return False
+        connection.execute(text(f"CREATE INDEX {self.name} ON {self.table} ({', '.join(self.columns)})"))
+        return True
+
+    def __str__(self):
+        return f"create index {self.name}"
 
 MIGRATIONS = [
     {
+        'version': 1,
         'name': 'add_source_username_and_blacklist',
-        'sql': [
-            # Add source_username field to albums
-            """
-            ALTER TABLE albums ADD COLUMN source_username TEXT;
-            """,
-            # Table pour blacklist des sources par album
-            """
-            CREATE TABLE IF NOT EXISTS album_blacklist_sources (
-                album_id TEXT NOT NULL,
-                username TEXT NOT NULL,
-                added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (album_id, username)
-            );
-            """
+        # album_blacklist_sources is created by create_all
+        'operations': [
+            AddColumn('albums', Column('source_username', String))
+        ]
+    },
+    {
+        'version': 2,
+        'name': 'add_album_priority_and_candidate_queue_length',
+        'operations': [
+            # Download priority of albums (higher first)
+            AddColumn('albums', Column('priority', Integer, nullable=False, server_default='0')),
+            # Peer queue length reported with each stored source
+            AddColumn('album_source_candidates', Column('queue_length', Integer, server_default='0'))
+        ]
+    },
+    {
+        'version': 3,
+        'name': 'add_status_and_foreign_key_indexes',
+        # Indexes of the pending/downloading album and track status queries,
+        # (album_id, status) also serves lookups on tracks.album_id alone
+        'operations': [
+            CreateIndex('ix_tracks_status', 'tracks', ['status']),
+            CreateIndex('ix_tracks_album_id_status', 'tracks', ['album_id', 'status']),
+            CreateIndex('ix_albums_status', 'albums', ['status']),
+            CreateIndex('ix_albums_artist_id', 'albums', ['artist_id'])
+        ]
+    },
+    {
+        'version': 4,
+        'name': 'add_album_progress_counters',
+        'operations': [
+            AddColumn('albums', Column('total_tracks', Integer, nullable=False, server_default='0')),
+            AddColumn('albums', Column('completed_tracks', Integer, nullable=False, server_default='0')),
+            RunSQL(
+                """
+                UPDATE albums SET
+                    total_tracks = (SELECT COUNT(*) FROM tracks WHERE tracks.album_id = albums.id),
+                    completed_tracks = (SELECT COUNT(*) FROM tracks WHERE tracks.album_id = albums.id AND tracks.status = 'completed')
+                """,
+                "backfill albums.total_tracks and albums.completed_tracks"
+            )
         ]
     }
 ]
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'downloads.db')
+schema_migrations = Table(
+    'schema_migrations',
+    MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', Text, nullable=False),
+    Column('applied_date', DateTime, default=datetime.utcnow)
+)
 
+# Key of the PostgreSQL advisory lock taken while migrating
+MIGRATION_LOCK_ID = 7461535
+# Serializes runs between threads of a process, the advisory lock between processes
+_migration_lock = threading.Lock()
 
-def run_migrations():
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        # Create migration table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS migrations (
-                name TEXT PRIMARY KEY,
-                applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        for migration in MIGRATIONS:
-            cursor.execute('SELECT name FROM migrations WHERE name = ?', (migration['name'],))
-            if cursor.fetchone():
-                print(f"Migration déjà appliquée: {migration['name']}")
-                continue
-            for sql in migration['sql']:
-                try:
-                    cursor.execute(sql)
-                except sqlite3.OperationalError as e:
-                    # Ignore l'erreur si la colonne existe déjà
-                    if 'duplicate column name' in str(e) or 'already exists' in str(e):
-                        continue
-                    else:
-                        raise
-            cursor.execute('INSERT INTO migrations (name) VALUES (?)', (migration['name'],))
-            conn.commit()
-            print(f"Migration appliquée: {migration['name']}")
+def run_migrations(engine, metadata=None):
+    """Crée les tables manquantes de metadata s'il est fourni, puis applique, dans l'ordre,
+    les migrations dont la version n'est pas encore enregistrée.
+
+    Plusieurs processus peuvent démarrer en même temps, avant même que schema_migrations
+    existe : sous PostgreSQL, un verrou consultatif sérialise la création des tables (y compris
+    schema_migrations) et les migrations. Chaque migration relit sa version dans sa transaction,
+    et une version enregistrée entre-temps par un autre processus est ignorée.
+
+    SQLite n'a pas de verrou équivalent entre processus : une base SQLite ne doit être utilisée
+    que par un seul processus (l'image Docker n'en démarre qu'un), dont les threads sont sérialisés.
+    """
+    postgresql = engine.dialect.name == 'postgresql'
+    with _migration_lock, engine.connect() as lock_connection:
+        if postgresql:
+            lock_connection.execute(text("SELECT pg_advisory_lock(:id)"), {'id': MIGRATION_LOCK_ID})
+            lock_connection.commit()
+        try:
+            if metadata is not None:
+                metadata.create_all(bind=engine)
+            _apply_migrations(engine)
+        finally:
+            if postgresql:
+                lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': MIGRATION_LOCK_ID})
+                lock_connection.commit()
+
+def _apply_migrations(engine):
+    schema_migrations.create(bind=engine, checkfirst=True)
+    with engine.connect() as connection:
+        applied = set(connection.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version)).scalars())
+
+    for migration in sorted(MIGRATIONS, key=lambda m: m['version']):
+        if migration['version'] in applied:
+            continue
+        # One transaction per migration, recorded with its operations
+        try:
+            with engine.begin() as connection:
+                recorded = connection.execute(
+                    schema_migrations.select().where(schema_migrations.c.version == migration['version'])
+                ).first()
+                if recorded:
+                    continue
+                for operation in migration['operations']:
+                    if operation.apply(connection):
+                        print(f"[DB MIGRATION] {migration['name']}: {operation}")
+                connection.execute(schema_migrations.insert().values(version=migration['version'], name=migration['name']))
+        except IntegrityError:
+            # Recorded by another process in the meantime, this transaction was rolled back
+            print(f"Migration déjà appliquée par un autre processus: {migration['version']} {migration['name']}")
+            continue
+        print(f"Migration appliquée: {migration['version']} {migration['name']}")
 
 if __name__ == "__main__":
-    run_migrations()
+    from app.db import engine
+    run_migrations(engine)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, BigInteger, Float, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -14,26 +14,33 @@ class Artist(Base):
 class Album(Base):
     __tablename__ = 'albums'
     id = Column(String, primary_key=True)
-    artist_id = Column(String, ForeignKey('artists.id'), nullable=False)
+    artist_id = Column(String, ForeignKey('artists.id'), nullable=False, index=True)
     title = Column(String, nullable=False)
     release_date = Column(String)
     cover_url = Column(Text)
-    status = Column(String, default='pending')
+    status = Column(String, default='pending', index=True)
     added_date = Column(DateTime, default=datetime.utcnow)
     download_date = Column(DateTime)
     source_username = Column(String)
+    priority = Column(Integer, default=0, nullable=False)
+    # Maintained with track status changes, see Database.recount_album_progress
+    total_tracks = Column(Integer, default=0, nullable=False, server_default='0')
+    completed_tracks = Column(Integer, default=0, nullable=False, server_default='0')
     artist = relationship('Artist', back_populates='albums')
     tracks = relationship('Track', back_populates='album')
     blacklist_sources = relationship('AlbumBlacklistSource', back_populates='album')
 
 class Track(Base):
     __tablename__ = 'tracks'
+    __table_args__ = (
+        Index('ix_tracks_album_id_status', 'album_id', 'status'),
+    )
     id = Column(String, primary_key=True)
     album_id = Column(String, ForeignKey('albums.id'), nullable=False)
     title = Column(String, nullable=False)
     position = Column(String)
     length = Column(Integer)
-    status = Column(String, default='pending')
+    status = Column(String, default='pending', index=True)
     added_date = Column(DateTime, default=datetime.utcnow)
     download_date = Column(DateTime)
     local_path = Column(Text)
@@ -52,3 +59,27 @@ class AlbumBlacklistSource(Base):
     username = Column(String, primary_key=True)
     added_date = Column(DateTime, default=datetime.utcnow)
     album = relationship('Album', back_populates='blacklist_sources')
+
+class AlbumSourceCandidate(Base):
+    __tablename__ = 'album_source_candidates'
+    # No foreign key: candidates must survive an album cancel to be reused by a retry
+    album_id = Column(String, primary_key=True)
+    username = Column(String, primary_key=True)
+    directory = Column(String, primary_key=True)
+    rank = Column(Integer, nullable=False, default=0)
+    score = Column(Float, default=0.0)
+    queue_length = Column(Integer, default=0)
+    files = Column(Text, nullable=False)  # JSON {track_id: file}
+    added_date = Column(DateTime, default=datetime.utcnow)
+    expiration_date = Column(DateTime, nullable=False)
+
+class PeerStat(Base):
+    __tablename__ = 'peer_stats'
+    username = Column(String, primary_key=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    bytes_downloaded = Column(BigInteger, nullable=False, default=0)
+    avg_speed = Column(Float)  # bytes/s, moyenne glissante
+    avg_ttfb = Column(Float)  # secondes entre la demande et le début du transfert
+    last_transfer_end = Column(DateTime)  # fin du dernier transfert pris en compte
+    last_seen = Column(DateTime)
@@ -29,9 +29,10 @@ def init_routes(musicbrainz_service, download_manager):
                 secondary_types=secondary_types
             )
 
-            # Get download status for each album
+            # Get download status of all albums at once
+            statuses = download_manager.get_album_statuses([album['id'] for album in album_list])
             for album in album_list:
-                status = download_manager.get_album_status(album['id'])
+                status = statuses.get(album['id'])
                 if status:
                     album['download_status'] = status[2]
                     album['total_tracks'] = status[3]
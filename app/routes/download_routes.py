@@ -2,18 +2,16 @@ from flask import Blueprint, request, jsonify
 
 download_routes = Blueprint('download_routes', __name__)
 
-def init_routes(musicbrainz_service, download_manager):
+def init_routes(musicbrainz_service, download_manager, discography_queue):
     @download_routes.route('/download/album/<album_id>', methods=['POST'])
     def queue_album_download(album_id):
         try:
             album_info = musicbrainz_service.get_album_tracks(album_id)
             artist_id = request.form.get('artist_id')
+            priority = request.form.get('priority', type=int)
             
-            # Add album to download queue
-            download_manager.queue_album(album_id, artist_id, album_info)
-            
-            # Immediately start the download process
-            download_manager.process_pending_downloads()
+            # Add album to download queue, the background scheduler starts it
+            download_manager.queue_album(album_id, artist_id, album_info, priority=priority)
             
             return jsonify({'status': 'success', 'message': 'Album ajouté à la file de téléchargement'})
 
@@ -21,6 +19,47 @@ def init_routes(musicbrainz_service, download_manager):
             print(f"Error on queue download")
             return jsonify({'error': str(e)}), 500
 
+    @download_routes.route('/download/artist/<artist_id>', methods=['POST'])
+    def queue_artist_download(artist_id):
+        # Queue a whole discography, filtered like the albums page
+        try:
+            result = discography_queue.queue_artist(
+                artist_id,
+                primary_types=request.form.getlist('primary_type'),
+                secondary_types=request.form.getlist('secondary_type'),
+                priority=request.form.get('priority', type=int)
+            )
+            return jsonify({'status': 'success', **result})
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @download_routes.route('/download/albums', methods=['POST'])
+    def queue_albums_download():
+        # Queue a list of release groups of one artist
+        data = request.get_json(silent=True) or {}
+        artist_id = data.get('artist_id') or request.form.get('artist_id')
+        album_ids = data.get('album_ids') or request.form.getlist('album_id')
+        priority = data.get('priority', request.form.get('priority', type=int))
+        if not artist_id or not album_ids:
+            return jsonify({'error': 'Paramètres "artist_id" et "album_ids" requis'}), 400
+        try:
+            result = discography_queue.queue_release_groups(artist_id, album_ids, priority)
+            return jsonify({'status': 'success', **result})
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @download_routes.route('/download/album/<album_id>/priority', methods=['POST'])
+    def set_album_priority(album_id):
+        priority = request.form.get('priority', type=int)
+        if priority is None:
+            return jsonify({'error': 'Paramètre "priority" entier requis'}), 400
+        try:
+            if not download_manager.set_album_priority(album_id, priority):
+                return jsonify({'error': 'Album non trouvé'}), 404
+            return jsonify({'status': 'success', 'message': 'Priorité mise à jour'})
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
     @download_routes.route('/cancel/album/<album_id>', methods=['POST'])
     def cancel_album_download(album_id):
         try:
@@ -34,12 +73,11 @@ def init_routes(musicbrainz_service, download_manager):
         try:
             album_info = musicbrainz_service.get_album_tracks(album_id)
             artist_id = request.form.get('artist_id')
-
-            
+            # Bypass cached search results for forced retries
+            force_refresh = request.form.get('force_refresh', 'false').lower() == 'true'
 
             # Re-add album to download queue
-            download_manager.queue_album(album_id, artist_id, album_info)
-            download_manager.process_pending_downloads()
+            download_manager.queue_album(album_id, artist_id, album_info, force_refresh=force_refresh)
             return jsonify({'status': 'success', 'message': 'Nouvelle tentative de téléchargement lancée'})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -0,0 +1,18 @@
+from flask import Blueprint, request, jsonify
+from app.config.settings import Config
+
+event_routes = Blueprint('event_routes', __name__)
+
+def init_routes(download_events):
+    @event_routes.route('/events/slskd', methods=['POST'])
+    def slskd_webhook():
+        # Optional shared secret, sent by slskd as a custom webhook header
+        if Config.SLSKD_WEBHOOK_API_KEY and request.headers.get('X-API-Key') != Config.SLSKD_WEBHOOK_API_KEY:
+            return jsonify({'error': 'Clé API invalide'}), 401
+
+        payload = request.get_json(silent=True) or {}
+        event_type = payload.get('type', 'unknown')
+        download_events.notify('webhook', event_type)
+        return jsonify({'status': 'success'})
+
+    return event_routes
@@ -1,33 +1,46 @@
-from flask import Blueprint, render_template, jsonify, request
+from itertools import groupby
+from flask import Blueprint, render_template, jsonify, request, url_for
+from app.config.settings import Config
 
 library_routes = Blueprint('library_routes', __name__)
 
 def init_routes(library_service):
     @library_routes.route('/library', methods=['GET'])
     def library():
+        wants_html = 'text/html' in request.headers.get('Accept', '')
+        # The HTML page is paginated by default, the JSON endpoint only when asked
+        limit = request.args.get('limit', Config.LIBRARY_PAGE_SIZE if wants_html else None, type=int)
+        cursor = request.args.get('cursor')
         try:
-            albums = library_service.get_all_albums()
-            # Group albums by artist
-            artists_dict = {}
-            for album in albums:
-                artist_id = album['artist_id']
-                artist_name = album['artist_name']
-                if artist_id not in artists_dict:
-                    artists_dict[artist_id] = {
-                        'id': artist_id,
-                        'name': artist_name,
-                        'albums': []
-                    }
-                artists_dict[artist_id]['albums'].append(album)
-            artists = list(artists_dict.values())
-            if 'text/html' in request.headers.get('Accept', ''):
-                return render_template('library.html', artists=artists)
-            return jsonify(artists)
+            albums, next_cursor = library_service.get_albums_page(limit=limit, cursor=cursor)
+        except ValueError as e:
+            if wants_html:
+                return render_template('library.html', error=str(e))
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
-            if 'text/html' in request.headers.get('Accept', ''):
+            if wants_html:
                 return render_template('library.html', error=str(e))
             return jsonify({'error': str(e)}), 500
 
+        # Albums are sorted by artist: group consecutive albums
+        artists = []
+        for artist_id, group in groupby(albums, key=lambda album: album['artist_id']):
+            artist_albums = list(group)
+            artists.append({
+                'id': artist_id,
+                'name': artist_albums[0]['artist_name'],
+                'albums': artist_albums
+            })
+        if wants_html:
+            next_url = url_for('library_routes.library', limit=limit, cursor=next_cursor) if next_cursor else None
+            return render_template('library.html', artists=artists, next_url=next_url)
+        response = jsonify(artists)
+        if next_cursor:
+            # The body stays a list of artists, the next page is given in headers
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{url_for("library_routes.library", limit=limit, cursor=next_cursor)}>; rel="next"'
+        return response
+
     @library_routes.route('/library/artist/<artist_id>', methods=['GET'])
     def artist_library(artist_id):
         try:
@@ -0,0 +1,125 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Deque, Dict, List, Set
+from app.utils.logger import setup_logger
+from app.services.slsk_models import SlskAlbumCandidate
+
+class AlbumSearchScheduler:
+    """Exécute la recherche de sources de plusieurs albums en parallèle.
+
+    Le nombre d'albums traités simultanément est borné, de même que le nombre
+    de navigations de dossiers (globalement et par pair Soulseek).
+    """
+
+    def __init__(self, max_concurrent_albums: int = 4, max_concurrent_browses: int = 8, max_browses_per_peer: int = 1):
+        self.max_concurrent_albums = max(1, max_concurrent_albums)
+        self.max_browses_per_peer = max(1, max_browses_per_peer)
+        self._browse_executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent_browses), thread_name_prefix='slsk-browse')
+        # Running browses and browses waiting for a slot, per peer
+        self._running_browses: Dict[str, int] = {}
+        self._waiting_browses: Dict[str, Deque[tuple]] = {}
+        self._peer_slots_lock = threading.Lock()
+        self._in_flight: Set[str] = set()
+        self._in_flight_lock = threading.Lock()
+        self.logger = setup_logger('album_search_scheduler', 'downloads.log')
+
+    def submit_browse(self, username: str, browse: Callable[..., Any], *args) -> Future:
+        """Planifie la navigation d'un dossier d'un pair en respectant les limites de concurrence.
+
+        Au-delà de la limite du pair, la navigation attend dans la file de ce pair sans occuper
+        de thread de navigation ; elle démarre dès qu'une navigation de ce pair se termine.
+        Une navigation annulée avant son démarrage libère sa place.
+        """
+        future = Future()
+        with self._peer_slots_lock:
+            start = self._running_browses.get(username, 0) < self.max_browses_per_peer
+            if start:
+                self._running_browses[username] = self._running_browses.get(username, 0) + 1
+            else:
+                self._waiting_browses.setdefault(username, deque()).append((future, browse, args))
+        if start:
+            self._start_browse(username, future, browse, args)
+        return future
+
+    def _start_browse(self, username: str, future: Future, browse: Callable[..., Any], args: tuple) -> None:
+        def run_browse():
+            if not future.set_running_or_notify_cancel():
+                self._finish_browse(username)
+                return
+            try:
+                future.set_result(browse(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._finish_browse(username)
+
+        try:
+            self._browse_executor.submit(run_browse)
+        except Exception as e:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(e)
+            self._finish_browse(username)
+
+    def _finish_browse(self, username: str) -> None:
+        """Libère la place d'un pair, ou la passe à sa prochaine navigation en attente."""
+        with self._peer_slots_lock:
+            waiting = self._waiting_browses.get(username)
+            next_browse = waiting.popleft() if waiting else None
+            if waiting is not None and not waiting:
+                del self._waiting_browses[username]
+            if next_browse is None:
+                self._running_browses[username] -= 1
+                if not self._running_browses[username]:
+                    del self._running_browses[username]
+        if next_browse is not None:
+            self._start_browse(username, *next_browse)
+
+    def run(self, albums: List[Dict], select_source: Callable[[Dict], List[SlskAlbumCandidate]],
+            on_result: Callable[[Dict, List[SlskAlbumCandidate]], None]) -> None:
+        """Recherche une source pour chaque album en parallèle.
+
+        Args:
+            albums: Albums à traiter
+            select_source: Fonction exécutée dans un thread de travail pour chaque album
+            on_result: Appelée dans le thread appelant dès qu'un album est terminé
+        """
+        claimed = [album for album in albums if self._claim(album['id'])]
+        if len(claimed) < len(albums):
+            self.logger.info(f"{len(albums) - len(claimed)} albums already being searched, skipping them")
+        if not claimed:
+            return
+
+        try:
+            workers = min(self.max_concurrent_albums, len(claimed))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='album-search') as executor:
+                futures = {executor.submit(select_source, album): album for album in claimed}
+                for future in as_completed(futures):
+                    album = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error searching source for album {album['title']}: {str(e)}")
+                        result = []
+                    try:
+                        on_result(album, result)
+                    except Exception as e:
+                        self.logger.error(f"Error reporting result for album {album['title']}: {str(e)}")
+                        self.logger.exception("Full stack trace:")
+                    finally:
+                        self._release(album['id'])
+        finally:
+            for album in claimed:
+                self._release(album['id'])
+
+    def _claim(self, album_id: str) -> bool:
+        """Marque un album comme en cours de recherche, False s'il l'est déjà."""
+        with self._in_flight_lock:
+            if album_id in self._in_flight:
+                return False
+            self._in_flight.add(album_id)
+            return True
+
+    def _release(self, album_id: str) -> None:
+        with self._in_flight_lock:
+            self._in_flight.discard(album_id)
@@ -1,20 +1,28 @@
 import threading
-import time
 from app.services.download_manager import DownloadManager
 from app.utils.logger import setup_logger
 
 class BackgroundTaskManager:
     def __init__(self):
         self.threads = []
+        self.event_buses = []
         self.stop_event = threading.Event()
         self.processing_lock = threading.Lock()
         self.logger = setup_logger('background_tasks', 'background_tasks.log')
 
-    def start_download_monitor(self, download_manager: DownloadManager, interval=5):
-        """Démarre la surveillance des téléchargements en arrière-plan."""
+    def start_download_monitor(self, download_manager: DownloadManager, interval=5, idle_interval=60, debounce=0.25):
+        """Démarre la surveillance des téléchargements en arrière-plan.
+
+        La vérification est déclenchée par les événements de téléchargement, et à défaut
+        toutes les `interval` secondes (ou `idle_interval` si rien n'est en cours).
+        """
+        download_events = download_manager.events
+        self.event_buses.append(download_events)
+
         def monitor_downloads():
             self.logger.info("Starting download monitoring")
             while not self.stop_event.is_set():
+                downloading_albums = []
                 try:
                     # Utiliser un verrou pour éviter les vérifications simultanées
                     if self.processing_lock.acquire(blocking=False):
@@ -23,8 +31,17 @@ class BackgroundTaskManager:
                             downloading_albums = download_manager.status_tracker.get_downloading_albums()
                             if downloading_albums:
                                 self.logger.info(f"Checking {len(downloading_albums)} active downloads")
+                                # Fetch all transfers once and share them between albums
+                                snapshot = download_manager.transfers.refresh()
+                                # Record finished transfers before completed albums are cleared from slskd
+                                try:
+                                    download_manager.peer_reputation.observe(snapshot)
+                                except Exception as e:
+                                    self.logger.warning(f"Could not update peer statistics: {str(e)}")
                                 for album in downloading_albums:
-                                    download_manager._check_download_status(album)
+                                    download_manager._check_download_status(album, snapshot)
+                                # Write this tick's status transitions in one transaction
+                                download_manager.status_tracker.flush()
                             else:
                                 self.logger.debug("No active downloads to check")
                         finally:
@@ -32,20 +49,54 @@ class BackgroundTaskManager:
                 except Exception as e:
                     self.logger.error(f"Error during download monitoring: {str(e)}")
                     self.logger.exception(e)
-                time.sleep(interval)
+                finally:
+                    download_manager.status_tracker.db.remove_session()
+
+                # Sleep until a download event is received or the fallback interval expires
+                if download_events.wait(interval if downloading_albums else idle_interval):
+                    # Let bursts of events settle before checking
+                    self.stop_event.wait(debounce)
 
         thread = threading.Thread(target=monitor_downloads, daemon=True)
         thread.start()
         self.threads.append(thread)
         self.logger.info("Download monitoring thread started")
 
+    def start_download_scheduler(self, download_manager: DownloadManager, interval=60):
+        """Démarre en arrière-plan le lancement des albums en attente.
+
+        Le planificateur est réveillé lorsqu'un album est ajouté ou qu'un téléchargement se
+        termine, et à défaut toutes les `interval` secondes.
+        """
+        queue_events = download_manager.queue_events
+        self.event_buses.append(queue_events)
+
+        def schedule_downloads():
+            self.logger.info("Starting download scheduler")
+            while not self.stop_event.is_set():
+                try:
+                    download_manager.schedule_pending_downloads()
+                except Exception as e:
+                    self.logger.error(f"Error during download scheduling: {str(e)}")
+                    self.logger.exception(e)
+                finally:
+                    download_manager.status_tracker.db.remove_session()
+                queue_events.wait(interval)
+
+        thread = threading.Thread(target=schedule_downloads, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        self.logger.info("Download scheduler thread started")
+
     def stop_all(self):
         """Arrête toutes les tâches d'arrière-plan."""
         self.logger.info("Stopping background tasks...")
         self.stop_event.set()
+        for event_bus in self.event_buses:
+            event_bus.notify('shutdown')
         
         for thread in self.threads:
             thread.join()
         
         self.threads.clear()
-        self.logger.info("All tasks stopped")
\ No newline at end of file
+        self.logger.info("All tasks stopped")
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from app.utils.logger import setup_logger
+from app.services.slsk_models import SlskFile, SlskSearchResult
+
+@dataclass
+class RankedDirectory:
+    """Dossier d'un résultat de recherche, noté avant toute navigation."""
+    username: str
+    directory: str
+    files: List[SlskFile]
+    score: float
+    features: Dict[str, float]
+    queue_length: int = 0
+
+    def __str__(self) -> str:
+        """Retourne une représentation lisible du dossier noté."""
+        details = ', '.join(f"{name}={value:.2f}" for name, value in self.features.items())
+        return f"{self.score:.3f} {self.username}: {self.directory} ({len(self.files)} files; {details})"
+
+class CandidateRanker:
+    """Classe les dossiers des résultats de recherche à partir des seules données de la réponse."""
+
+    DEFAULT_WEIGHTS = {
+        'file_count': 4.0,
+        'extension': 1.0,
+        'bitrate': 1.0,
+        'upload_speed': 1.0,
+        'queue_length': 1.0,
+        'free_upload_slots': 1.0,
+        'duration': 1.0
+    }
+    # Upload speed (bytes/s) at which the speed feature reaches 0.5
+    REFERENCE_UPLOAD_SPEED = 1024 * 1024
+    # Queue length at which the queue feature reaches 0.5
+    REFERENCE_QUEUE_LENGTH = 10
+    MIN_FILE_SIZE_MB = 1.0
+    AUDIO_EXTENSIONS = ['mp3', 'flac', 'wav', 'm4a', 'ogg', 'wma']
+
+    def __init__(self, weights: Dict[str, float] = None, runtime_tolerance: float = 0.1):
+        self.weights = dict(self.DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.runtime_tolerance = runtime_tolerance
+        self.logger = setup_logger('candidate_ranker', 'track_matcher.log')
+
+    def rank(self, results: List[SlskSearchResult], wanted_count: int, allowed_extensions: List[str], wanted_length: Optional[float] = None) -> List[RankedDirectory]:
+        """Note chaque dossier des résultats et les retourne du meilleur au moins bon.
+
+        Args:
+            results: Résultats de recherche à classer
+            wanted_count: Nombre de pistes de l'album recherché
+            allowed_extensions: Extensions de fichier autorisées
+            wanted_length: Durée totale de l'album en secondes, None si inconnue
+
+        Returns:
+            Liste des dossiers contenant au moins un fichier valide et de durée compatible,
+            triée par score décroissant
+        """
+        allowed = [ext.lower().strip('.') for ext in allowed_extensions]
+        ranked = []
+        for result in results:
+            for directory, files in result.group_by_directory().items():
+                audio_files = [f for f in files if f.extension.lower() in self.AUDIO_EXTENSIONS or f.extension.lower() in allowed]
+                # Filter by file type and minimum size (to avoid snippets)
+                valid_files = [f for f in audio_files if f.extension.lower() in allowed and f.size_mb >= self.MIN_FILE_SIZE_MB]
+                if not valid_files:
+                    continue
+                if not self.is_runtime_compatible(valid_files, wanted_count, wanted_length):
+                    self.logger.debug(f"Rejected {result.username}: {directory}, runtime {self.runtime(valid_files)}s instead of {wanted_length:.0f}s")
+                    continue
+                features = self._features(result, valid_files, audio_files, wanted_count, wanted_length)
+                ranked.append(RankedDirectory(result.username, directory, valid_files, self._score(features), features, result.queue_length))
+
+        ranked.sort(key=lambda candidate: candidate.score, reverse=True)
+        for candidate in ranked:
+            self.logger.info(f"Candidate score: {candidate}")
+        return ranked
+
+    def runtime(self, files: List[SlskFile]) -> Optional[int]:
+        """Durée totale des fichiers en secondes, None si l'une des durées est inconnue."""
+        if not files or any(not f.length for f in files):
+            return None
+        return sum(f.length for f in files)
+
+    def is_runtime_compatible(self, files: List[SlskFile], wanted_count: int, wanted_length: Optional[float]) -> bool:
+        """Vérifie que la durée d'un dossier peut correspondre à celle de l'album.
+
+        Un dossier avec autant de fichiers que de pistes doit avoir la même durée totale à la
+        tolérance près ; un dossier avec des fichiers en plus ne peut pas être plus court.
+        Les dossiers incomplets ou de durée inconnue ne sont pas rejetés.
+        """
+        runtime = self.runtime(files)
+        if not wanted_length or runtime is None or len(files) < wanted_count:
+            return True
+        if len(files) == wanted_count:
+            return abs(runtime - wanted_length) <= self.runtime_tolerance * wanted_length
+        return runtime >= (1 - self.runtime_tolerance) * wanted_length
+
+    def _features(self, result: SlskSearchResult, valid_files: List[SlskFile], audio_files: List[SlskFile], wanted_count: int, wanted_length: Optional[float] = None) -> Dict[str, float]:
+        """Calcule les caractéristiques d'un dossier, chacune entre 0 et 1."""
+        file_count = len(valid_files)
+        wanted_count = max(wanted_count, 1)
+        if file_count >= wanted_count:
+            # Extra files (bonus tracks, other editions) are only slightly penalized
+            file_count_score = 1 - 0.5 * min(file_count - wanted_count, wanted_count) / wanted_count
+        else:
+            file_count_score = file_count / wanted_count
+
+        runtime = self.runtime(valid_files)
+        if wanted_length and runtime is not None:
+            duration_score = max(0.0, 1 - abs(runtime - wanted_length) / wanted_length)
+        else:
+            # Unknown durations are neither rewarded nor penalized much
+            duration_score = 0.5
+
+        bitrates = [min((f.bit_rate or 0) / 320, 1.0) if f.bit_rate else (1.0 if f.extension.lower() == 'flac' else 0.5)
+                    for f in valid_files]
+
+        return {
+            'file_count': file_count_score,
+            'extension': len(valid_files) / len(audio_files),
+            'bitrate': sum(bitrates) / len(bitrates),
+            'upload_speed': result.upload_speed / (result.upload_speed + self.REFERENCE_UPLOAD_SPEED) if result.upload_speed > 0 else 0.0,
+            'queue_length': self.REFERENCE_QUEUE_LENGTH / (self.REFERENCE_QUEUE_LENGTH + max(result.queue_length, 0)),
+            'free_upload_slots': 1.0 if result.free_upload_slots else 0.0,
+            'duration': duration_score
+        }
+
+    def _score(self, features: Dict[str, float]) -> float:
+        """Combine les caractéristiques selon les poids configurés."""
+        total_weight = sum(self.weights.get(name, 0) for name in features)
+        if total_weight <= 0:
+            return 0.0
+        return sum(self.weights.get(name, 0) * value for name, value in features.items()) / total_weight
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from app.utils.logger import setup_logger
+
+class DiscographyQueueService:
+    """Ajoute en une fois plusieurs albums à la file de téléchargement.
+
+    Les listes de pistes sont résolues auprès de MusicBrainz avec une
+    concurrence bornée, puis tous les albums sont enregistrés en une seule
+    transaction et confiés au planificateur de téléchargements.
+    """
+
+    def __init__(self, musicbrainz_service, download_manager, max_concurrent_requests: int = 2):
+        self.musicbrainz_service = musicbrainz_service
+        self.download_manager = download_manager
+        self.max_concurrent_requests = max(1, max_concurrent_requests)
+        self.logger = setup_logger('discography_queue', 'downloads.log')
+
+    def queue_artist(self, artist_id: str, primary_types: Optional[List[str]] = None,
+                     secondary_types: Optional[List[str]] = None, priority: Optional[int] = None) -> Dict:
+        """Ajoute à la file tous les albums d'un artiste correspondant aux filtres de type."""
+        release_groups = self.musicbrainz_service.get_albums_for_artist(
+            artist_id,
+            primary_types=primary_types,
+            secondary_types=secondary_types
+        )
+        self.logger.info(f"{len(release_groups)} release groups found for artist {artist_id}")
+        return self.queue_release_groups(artist_id, [rg['id'] for rg in release_groups], priority)
+
+    def queue_release_groups(self, artist_id: str, album_ids: List[str], priority: Optional[int] = None) -> Dict:
+        """Ajoute à la file une liste d'albums (release groups MusicBrainz) d'un artiste.
+
+        Returns:
+            Dict: Identifiants des albums ajoutés et erreurs de résolution par album
+        """
+        album_ids = list(dict.fromkeys(album_ids))
+        albums_info, failed = self._resolve_tracklists(album_ids)
+
+        if albums_info:
+            self.download_manager.queue_albums(artist_id, albums_info, priority)
+        self.logger.info(f"Queued {len(albums_info)}/{len(album_ids)} albums for artist {artist_id}")
+        return {
+            'queued': [album['id'] for album in albums_info],
+            'failed': failed
+        }
+
+    def _resolve_tracklists(self, album_ids: List[str]):
+        """Récupère les pistes de chaque album, au plus max_concurrent_requests requêtes à la fois."""
+        resolved: Dict[str, dict] = {}
+        failed: Dict[str, str] = {}
+        if not album_ids:
+            return [], failed
+
+        workers = min(self.max_concurrent_requests, len(album_ids))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mb-tracklist') as executor:
+            futures = {executor.submit(self.musicbrainz_service.get_album_tracks, album_id): album_id for album_id in album_ids}
+            for future in as_completed(futures):
+                album_id = futures[future]
+                try:
+                    album_info = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error resolving tracklist for album {album_id}: {str(e)}")
+                    failed[album_id] = str(e)
+                    continue
+                if not album_info or not album_info.get('tracks'):
+                    self.logger.warning(f"No tracklist found for album {album_id}")
+                    failed[album_id] = "Aucune piste trouvée"
+                    continue
+                resolved[album_id] = dict(album_info, id=album_id)
+
+        # Keep the requested order so the scheduler starts albums as listed
+        return [resolved[album_id] for album_id in album_ids if album_id in resolved], failed
@@ -0,0 +1,82 @@
+import os
+import threading
+from typing import List
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from app.utils.logger import setup_logger
+
+class DownloadEventBus:
+    """Réveille la surveillance des téléchargements lorsqu'un changement est signalé."""
+
+    def __init__(self):
+        # Events received and not yet consumed by wait()
+        self._pending = 0
+        self._condition = threading.Condition()
+        self.logger = setup_logger('download_events', 'downloads.log')
+
+    def notify(self, source: str, detail: str = '') -> None:
+        """Signale qu'un téléchargement a changé d'état."""
+        self.logger.debug(f"Download event from {source}: {detail}")
+        with self._condition:
+            self._pending += 1
+            self._condition.notify_all()
+
+    def wait(self, timeout: float) -> bool:
+        """Attend un événement pendant au plus timeout secondes.
+
+        Les événements reçus sont consommés sous le même verrou que leur attente : un
+        événement signalé pendant le réveil est retourné par l'appel suivant, jamais perdu.
+
+        Returns:
+            True si un événement a été reçu, False si le délai a expiré
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending > 0, timeout)
+            triggered = self._pending > 0
+            self._pending = 0
+            return triggered
+
+class DownloadDirectoryWatcher(FileSystemEventHandler):
+    """Surveille le dossier de téléchargement Slskd et signale les fichiers terminés."""
+
+    def __init__(self, event_bus: DownloadEventBus, directory: str, extensions: List[str]):
+        super().__init__()
+        self.event_bus = event_bus
+        self.directory = directory
+        self.extensions = [f".{ext.lower().strip('.')}" for ext in extensions]
+        self.observer = None
+        self.logger = setup_logger('download_events', 'downloads.log')
+
+    def start(self) -> bool:
+        """Démarre la surveillance, retourne False si le dossier n'existe pas."""
+        if not os.path.isdir(self.directory):
+            self.logger.warning(f"Download folder not found, file events disabled: {self.directory}")
+            return False
+        self.observer = Observer()
+        self.observer.daemon = True
+        self.observer.schedule(self, self.directory, recursive=True)
+        self.observer.start()
+        self.logger.info(f"Watching download folder: {self.directory}")
+        return True
+
+    def stop(self) -> None:
+        """Arrête la surveillance."""
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def on_created(self, event):
+        self._notify(event, event.src_path)
+
+    def on_closed(self, event):
+        self._notify(event, event.src_path)
+
+    def on_moved(self, event):
+        self._notify(event, event.dest_path)
+
+    def _notify(self, event, path: str) -> None:
+        if event.is_directory:
+            return
+        if os.path.splitext(path)[1].lower() in self.extensions:
+            self.event_bus.notify('filesystem', path)
@@ -1,29 +1,57 @@
 from app.database import Database, DownloadStatus
 from app.utils.logger import setup_logger
-from typing import Dict, List
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+from concurrent.futures import FIRST_COMPLETED, wait
 import os
+import threading
+import time
 from app.config.settings import Config
-from app.services.downloaders import Downloader, SlskdDownloader
+from app.services.downloaders import Downloader, SlskdDownloader, SlskdFileState
 from app.services.filesystem import FileSystemService
 from app.services.track_matcher import TrackMatcher
+from app.services.similarity import create_similarity
 from app.services.download_status_tracker import DownloadStatusTracker
 from app.services.album_processor import AlbumProcessor
-from app.services.slsk_models import SlskFile
+from app.services.album_search_scheduler import AlbumSearchScheduler
+from app.services.candidate_ranker import CandidateRanker, RankedDirectory
+from app.services.slsk_models import SlskAlbumCandidate, SlskDirectory, SlskFile, SlskSearchResult
+from app.services.download_events import DownloadEventBus
+from app.services.transfer_snapshot import TransferSnapshot, TransferSnapshotService
+from app.services.peer_reputation import PeerReputationService
 
 class DownloadManager:
     def __init__(self, database: Database):
         self.downloader: SlskdDownloader = None
+        self.transfers: TransferSnapshotService = None
+        self.events = DownloadEventBus()
+        # Wakes the download scheduler when albums are queued or slots are freed
+        self.queue_events = DownloadEventBus()
+        self._force_refresh_albums = set()
+        self._force_refresh_lock = threading.Lock()
         self.logger = setup_logger('download_manager', 'downloads.log')
         
         # Initialize services
         self.filesystem = FileSystemService("/downloads", Config.FORMATTED_SONGS_DIR)
         self.status_tracker = DownloadStatusTracker(database)
-        self.track_matcher = TrackMatcher(Config.SLSKD_MIN_MATCH_RATIO)
+        self.track_matcher = TrackMatcher(
+            Config.SLSKD_MIN_MATCH_RATIO,
+            create_similarity(Config.TRACK_MATCH_SIMILARITY),
+            Config.TRACK_MATCH_DURATION_TOLERANCE
+        )
+        self.candidate_ranker = CandidateRanker(Config.SLSKD_RANKING_WEIGHTS, Config.SLSKD_RUNTIME_TOLERANCE)
         self.album_processor = AlbumProcessor(self.filesystem, self.status_tracker)
+        self.peer_reputation = PeerReputationService(database)
+        self.search_scheduler = AlbumSearchScheduler(
+            Config.SLSKD_MAX_CONCURRENT_SEARCHES,
+            Config.SLSKD_MAX_CONCURRENT_BROWSES,
+            Config.SLSKD_MAX_BROWSES_PER_PEER
+        )
 
     def configure_downloader(self, downloader: Downloader) -> None:
         """Configure le téléchargeur à utiliser."""
         self.downloader = downloader
+        self.transfers = TransferSnapshotService(downloader.get_downloads_status)
 
     def configure_slskd(self, host_url: str, api_key: str, url_base: str = '/') -> None:
         """Configure un téléchargeur Slskd."""
@@ -31,93 +59,252 @@ class DownloadManager:
         downloader.configure(host_url=host_url, api_key=api_key, url_base=url_base)
         self.configure_downloader(downloader)
 
-    def queue_album(self, album_id: str, artist_id: str, album_info: dict) -> None:
-        """Ajoute un album à la file de téléchargement."""
-        # Add artist to the database
+    def queue_album(self, album_id: str, artist_id: str, album_info: dict, force_refresh: bool = False,
+                    priority: Optional[int] = None) -> None:
+        """Ajoute un album à la file de téléchargement.
+
+        Avec force_refresh, la prochaine recherche de l'album ignore le cache des recherches.
+        Le planificateur de téléchargements est réveillé une fois l'album enregistré.
+        """
+        if force_refresh:
+            with self._force_refresh_lock:
+                self._force_refresh_albums.add(album_id)
+
+        album = self._build_album_record(album_id, artist_id, album_info, priority)
+        # Artist, album and tracks are upserted in a single transaction
+        self.status_tracker.add_albums(artist_id, album['artist_name'], [album])
+        self.queue_events.notify('download_manager', f"album {album_id} queued")
+
+    def queue_albums(self, artist_id: str, albums_info: List[dict], priority: Optional[int] = None) -> None:
+        """Ajoute plusieurs albums d'un artiste à la file de téléchargement en une seule transaction.
+
+        Les albums déjà téléchargés ou en cours de téléchargement gardent leur statut.
+        """
+        albums = [self._build_album_record(album_info['id'], artist_id, album_info, priority) for album_info in albums_info]
+        if not albums:
+            return
+        # Re-queueing a discography must not download the library again
+        self.status_tracker.add_albums(
+            artist_id,
+            albums[0]['artist_name'],
+            albums,
+            (DownloadStatus.COMPLETED, DownloadStatus.DOWNLOADING)
+        )
+        self.queue_events.notify('download_manager', f"{len(albums)} albums queued")
+
+    def _build_album_record(self, album_id: str, artist_id: str, album_info: dict, priority: Optional[int] = None) -> dict:
+        """Prépare l'album et ses pistes tels qu'ils sont enregistrés en base."""
         artist_name = album_info.get('artist_name')
         if not artist_name and album_info.get('tracks'):
             if album_info['tracks'][0].get('artists'):
                 artist_name = album_info['tracks'][0]['artists'][0]
         if not artist_name:
             artist_name = "Artiste Inconnu"
-            
-        self.status_tracker.add_artist(artist_id, artist_name)
-            
-        # Add album
-        self.status_tracker.add_album(
-            album_id,
-            artist_id,
-            album_info['title'],
-            album_info.get('release_date'),
-            album_info.get('cover_url')
-        )
 
-        self.status_tracker.update_album_status(album_id, DownloadStatus.PENDING)
-
-        self.logger.info(f"Album updated - List tracks")
-        # Add tracks
-        for track in album_info['tracks']:
-            self.logger.info(f"Add track - {track.get('id')}")
-            if track.get('id'):
-                self.status_tracker.add_track(
-                    track['id'],
-                    album_id,
-                    track['title'],
-                    track['position'],
-                    track.get('length'),
-                    artist=album_info.get('artist_name'),
-                    album_name=album_info.get('title'),
-                    track_num=str(track.get('position')) if track.get('position') else None,
-                    disc=track.get('disc'),
-                    year=album_info.get('release_date', '').split('-')[0] if album_info.get('release_date') else None,
-                    albumartist=album_info.get('artist_name')
-                )
+        year = album_info.get('release_date', '').split('-')[0] if album_info.get('release_date') else None
+        return {
+            'id': album_id,
+            'artist_id': artist_id,
+            'artist_name': artist_name,
+            'title': album_info['title'],
+            'release_date': album_info.get('release_date'),
+            'cover_url': album_info.get('cover_url'),
+            'priority': priority,
+            'tracks': [
+                {
+                    'id': track['id'],
+                    'title': track['title'],
+                    'position': track['position'],
+                    'length': track.get('length'),
+                    'artist': album_info.get('artist_name'),
+                    'album_name': album_info.get('title'),
+                    'track_num': str(track.get('position')) if track.get('position') else None,
+                    'disc': track.get('disc'),
+                    'year': year,
+                    'albumartist': album_info.get('artist_name')
+                }
+                for track in album_info['tracks'] if track.get('id')
+            ]
+        }
 
     def get_album_status(self, album_id: str) -> tuple:
         """Récupère le statut d'un album."""
         return self.status_tracker.get_album_status(album_id)
 
+    def get_album_statuses(self, album_ids: List[str]) -> Dict[str, tuple]:
+        """Récupère le statut de plusieurs albums."""
+        return self.status_tracker.get_album_statuses(album_ids)
+
     def get_tracks_status(self, album_id: str) -> dict:
         """Récupère le statut des pistes d'un album."""
         return self.status_tracker.get_tracks_status(album_id)
 
-    def process_pending_downloads(self) -> None:
-        """Traite les téléchargements en attente."""
+    def set_album_priority(self, album_id: str, priority: int) -> bool:
+        """Modifie la priorité de téléchargement d'un album (la plus haute d'abord)."""
+        if not self.status_tracker.db.set_album_priority(album_id, priority):
+            return False
+        self.queue_events.notify('download_manager', f"priority of {album_id} set to {priority}")
+        return True
+
+    def schedule_pending_downloads(self) -> None:
+        """Démarre les albums en attente par priorité, dans la limite des téléchargements simultanés
+        (globalement et par pair Soulseek)."""
         if not self.downloader:
             raise ValueError("Aucun téléchargeur n'est configuré")
 
-        # Process pending albums
         pending_albums = self.status_tracker.get_pending_albums()
-        self.logger.info(f"Processing {len(pending_albums)} pending albums")
-        
+        if not pending_albums:
+            return
+
+        # Count active albums, globally and per peer
+        downloading_albums = self.status_tracker.get_downloading_albums()
+        peer_load = Counter(album['source_username'] for album in downloading_albums if album.get('source_username'))
+        if Config.MAX_CONCURRENT_ALBUM_DOWNLOADS > 0:
+            capacity = Config.MAX_CONCURRENT_ALBUM_DOWNLOADS - len(downloading_albums)
+        else:
+            capacity = len(pending_albums)
+        self.logger.info(f"Processing {len(pending_albums)} pending albums ({len(downloading_albums)} downloading, {max(capacity, 0)} slots free)")
+        if capacity <= 0:
+            return
+
+        # Drop expired sources of previous attempts
+        self.status_tracker.db.delete_source_candidates()
+
+        # Check if albums are not already in progress
+        snapshot = self.transfers.refresh()
+        albums_to_search = []
         for album in pending_albums:
-            success = self._start_album_download(album)
-            if success:
+            if capacity <= 0:
+                break
+            if snapshot.has_directory(album['title']):
                 self.status_tracker.update_album_status(album['id'], DownloadStatus.DOWNLOADING)
-            else:
-                self.status_tracker.update_album_status(album['id'], DownloadStatus.ERROR)
+                capacity -= 1
+                continue
+            album['blacklisted_users'] = self.status_tracker.db.get_blacklisted_sources(album['id'])
+            with self._force_refresh_lock:
+                album['force_refresh'] = album['id'] in self._force_refresh_albums
+                self._force_refresh_albums.discard(album['id'])
+
+            # Skip the search when sources from a previous attempt are still known
+            if not album['force_refresh']:
+                candidates = self._get_album_candidates(album['id'], album['blacklisted_users'])
+                if candidates:
+                    self.logger.info(f"Reusing {len(candidates)} stored sources for album: {album['title']}")
+                    if self._start_album_download(album, candidates, peer_load):
+                        capacity -= 1
+                    continue
+            albums_to_search.append(album)
+            capacity -= 1
 
-        # Check ongoing downloads
-        downloading_albums = self.status_tracker.get_downloading_albums()
-        for album in downloading_albums:
-            self._check_download_status(album)
+        self.search_scheduler.run(
+            albums_to_search,
+            self._find_album_source,
+            lambda album, candidates: self._start_album_download(album, candidates, peer_load)
+        )
 
-    def _start_album_download(self, album: dict) -> bool:
-        """Démarre le téléchargement d'un album."""
-        try:
-            # Check if the album is not already in progress
-            downloads = self.downloader.get_downloads_status()
-            for download in downloads:
-                if not isinstance(download, dict):
+    def _start_album_download(self, album: dict, candidates: List[SlskAlbumCandidate], peer_load: Optional[Counter] = None) -> bool:
+        """Démarre le téléchargement d'un album depuis les sources retenues et enregistre le résultat.
+
+        Les pistes absentes de la meilleure source sont demandées aux sources suivantes. Si tous
+        les pairs ont atteint leur limite d'albums simultanés, l'album reste en attente.
+
+        Returns:
+            True si le téléchargement a démarré
+        """
+        if peer_load is None:
+            peer_load = Counter()
+        success = False
+        if candidates:
+            try:
+                # Keep the ranked sources for failover and retries
+                self.status_tracker.db.save_source_candidates(
+                    album['id'],
+                    [candidate.to_dict() for candidate in candidates],
+                    Config.SLSKD_CANDIDATE_EXPIRATION
+                )
+
+                reputations = self.peer_reputation.get_reputations(c.username for c in candidates)
+                available_candidates = self._order_candidates(candidates, peer_load, reputations)
+                if not available_candidates:
+                    self.logger.info(f"All sources of album {album['title']} are busy, keeping it pending")
+                    return False
+
+                best_candidate = available_candidates[0]
+                self.logger.info(f"Starting download with {best_candidate.username} ({best_candidate.match_count} files)")
+                self.status_tracker.db.set_album_source_username(album['id'], best_candidate.username)
+                success = self._enqueue_tracks(best_candidate, best_candidate.matching_files)
+                if success:
+                    peer_load[best_candidate.username] += 1
+                    self._enqueue_missing_tracks(album, best_candidate, available_candidates[1:], peer_load)
+            except Exception as e:
+                self.logger.error(f"Error starting download: {str(e)}")
+                self.logger.exception("Full stack trace:")
+
+        if success:
+            self.status_tracker.update_album_status(album['id'], DownloadStatus.DOWNLOADING)
+            self.events.notify('download_manager', f"download started for {album['title']}")
+        else:
+            self.status_tracker.update_album_status(album['id'], DownloadStatus.ERROR)
+        return success
+
+    def _enqueue_missing_tracks(self, album: dict, best_candidate: SlskAlbumCandidate,
+                                other_candidates: List[SlskAlbumCandidate], peer_load: Counter) -> None:
+        """Demande aux sources suivantes les pistes absentes de la meilleure source, sans dépasser
+        la limite d'albums simultanés par pair."""
+        limit = Config.MAX_CONCURRENT_ALBUM_DOWNLOADS_PER_PEER
+        used_peers = {best_candidate.username}
+        missing_tracks = [t['id'] for t in album['tracks'] if t['id'] not in best_candidate.matching_files]
+        for track_id in missing_tracks:
+            for candidate in other_candidates:
+                file = candidate.matching_files.get(track_id)
+                if not file:
+                    continue
+                # A peer already serving this album does not take another slot
+                if candidate.username not in used_peers and limit > 0 and peer_load[candidate.username] >= limit:
                     continue
-                for directory in download.get('directories', []):
-                    if directory.get('directory') == album['title']:
-                        return True
+                if self._enqueue_tracks(candidate, {track_id: file}):
+                    self.logger.info(f"Track {track_id} missing from {best_candidate.username}, downloading it from {candidate.username}")
+                    if candidate.username not in used_peers:
+                        used_peers.add(candidate.username)
+                        peer_load[candidate.username] += 1
+                    break
+
+    def _order_candidates(self, candidates: List[SlskAlbumCandidate], peer_load: Counter,
+                          reputations: Optional[Dict[str, float]] = None) -> List[SlskAlbumCandidate]:
+        """Classe les sources par pistes trouvées puis par score, pondéré par la réputation
+        du pair, sa file d'attente et le nombre d'albums déjà demandés à ce pair. Les pairs
+        ayant atteint la limite d'albums simultanés sont écartés."""
+        limit = Config.MAX_CONCURRENT_ALBUM_DOWNLOADS_PER_PEER
+        available = [c for c in candidates if limit <= 0 or peer_load[c.username] < limit]
+        reputations = reputations or {}
+
+        def weighted_score(candidate: SlskAlbumCandidate) -> float:
+            # An unknown peer (0.5) keeps its score, reliable fast peers get up to 1.5x
+            reputation = reputations.get(candidate.username, 0.5)
+            return candidate.score * (0.5 + reputation) / (1 + candidate.queue_length / 10 + peer_load[candidate.username])
+
+        return sorted(available, key=lambda c: (c.match_count, weighted_score(c)), reverse=True)
+
+    def _enqueue_tracks(self, candidate: SlskAlbumCandidate, files: Dict[str, SlskFile]) -> bool:
+        """Demande à un pair les fichiers de certaines pistes et les associe à ces pistes."""
+        if not self.downloader.start_download(candidate.username, candidate.directory, list(files.values())):
+            return False
+        for track_id, file in files.items():
+            self.status_tracker.update_track_status(track_id, DownloadStatus.PENDING, None, file.filename)
+        return True
+
+    def _find_album_source(self, album: dict) -> List[SlskAlbumCandidate]:
+        """Recherche les sources Soulseek d'un album, de la meilleure à la moins bonne.
 
+        Exécutée dans un thread de travail du planificateur : aucun accès à la base de données.
+        """
+        try:
             # Search for the album
             query = f"{album['artist_name']} {album['title']}"
-            blacklisted_users = self.status_tracker.db.get_blacklisted_sources(album['id'])
-            search_results = self.downloader.search(query)
+            blacklisted_users = album.get('blacklisted_users', [])
+            force_refresh = album.get('force_refresh', False)
+            is_sufficient = self._has_complete_folder(album)
+            search_results = self.downloader.search(query, force_refresh, is_sufficient)
             for r in search_results:
                 self.logger.debug(r)
             if not search_results:
@@ -125,46 +312,110 @@ class DownloadManager:
                 # Try searching with only the album title
                 query_title_only = album['title']
                 self.logger.info(f"Retrying search with title only: {query_title_only}")
-                search_results = self.downloader.search(query_title_only)
+                search_results = self.downloader.search(query_title_only, force_refresh, is_sufficient)
                 for r in search_results:
                     self.logger.debug(r)
                 if not search_results:
                     self.logger.warning(f"No result found for search: {query_title_only}")
-                    return False
-
-            best_result = None
-            best_match_count = 0
-            best_directory_path = ""
-            best_files: List[SlskFile] = []
-
-            # Analyze results
-            for result in search_results:
-                if result.username in self.downloader.ignored_users or result.username in blacklisted_users:
-                    continue
+                    return []
+
+            # Rank folders from the search responses and only browse the best ones
+            eligible_results = [
+                result for result in search_results
+                if result.username not in self.downloader.ignored_users and result.username not in blacklisted_users
+            ]
+            ranked_directories = self.candidate_ranker.rank(
+                eligible_results,
+                len(album['tracks']),
+                self.downloader.allowed_filetypes,
+                self._album_runtime(album)
+            )
+            directories = ranked_directories[:Config.SLSKD_MAX_BROWSED_CANDIDATES]
+            self.logger.info(f"Browsing {len(directories)} of {len(ranked_directories)} ranked folders for album: {album['title']}")
+
+            candidates = self._browse_candidates(album, directories)
+            if not candidates:
+                self.logger.warning(f"No match found for album: {album['title']}")
+            return candidates
 
-                # Filter by file type and minimum size (to avoid snippets)
-                valid_files = result.filter_by_extension(self.downloader.allowed_filetypes)
-                valid_files = result.filter_by_size(min_size_mb=1.0)
-
-                if not valid_files:
-                    continue
-
-                try:
-                    # For the first valid file, get its parent folder
-                    directory_path = valid_files[0].get_dir_name()
-                    self.logger.info(f"Getting folder content: {directory_path}")
-                    
-                    # Get all files in the folder
-                    directory_files = self.downloader.get_directory_content(result.username, directory_path)
-                    if not directory_files:
+        except Exception as e:
+            self.logger.error(f"Error searching album source: {str(e)}")
+            self.logger.exception("Full stack trace:")
+            return []
+
+    def _has_complete_folder(self, album: dict) -> Callable[[SlskSearchResult], bool]:
+        """Retourne un critère d'arrêt de recherche : un dossier contient au moins autant
+        de fichiers au bon format que l'album a de pistes, pour une durée compatible."""
+        wanted_count = len(album['tracks'])
+        wanted_length = self._album_runtime(album)
+
+        def is_sufficient(result: SlskSearchResult) -> bool:
+            if result.username in self.downloader.ignored_users or result.username in album.get('blacklisted_users', []):
+                return False
+            valid_files = [f for f in result.filter_by_extension(self.downloader.allowed_filetypes) if f.size_mb >= 1.0]
+            return any(
+                len(files) >= wanted_count and self.candidate_ranker.is_runtime_compatible(files, wanted_count, wanted_length)
+                for files in result.group_by_directory(valid_files).values()
+            )
+
+        return is_sufficient
+
+    def _album_runtime(self, album: dict) -> Optional[float]:
+        """Durée totale de l'album en secondes, None si la durée d'une piste est inconnue."""
+        lengths = [track.get('length') for track in album['tracks']]
+        if not lengths or not all(lengths):
+            return None
+        return sum(lengths) / 1000
+
+    def _browse_candidates(self, album: dict, directories: List[RankedDirectory]) -> List[SlskAlbumCandidate]:
+        """Parcourt en parallèle les dossiers candidats et retourne ceux qui contiennent des pistes,
+        triés par nombre de pistes trouvées puis par score.
+
+        Les navigations restantes sont abandonnées dès qu'un dossier contient toutes les pistes
+        voulues et que SLSKD_FAILOVER_SOURCES autres sources ont été trouvées pour les reprises
+        sur erreur, ou lorsque le délai SLSKD_BROWSE_TIMEOUT est dépassé.
+        """
+        if not directories:
+            return []
+
+        wanted_count = len([t for t in album['tracks'] if t.get('id') and t.get('title')])
+        futures = {}
+        for ranked in directories:
+            self.logger.info(f"Getting folder content: {ranked.directory}")
+            future = self.search_scheduler.submit_browse(
+                ranked.username, self.downloader.get_directory_content, ranked.username, ranked.directory
+            )
+            futures[future] = ranked
+
+        candidates: List[SlskAlbumCandidate] = []
+        best_candidate: Optional[SlskAlbumCandidate] = None
+        pending = set(futures)
+        deadline = time.monotonic() + Config.SLSKD_BROWSE_TIMEOUT
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.logger.warning(f"{len(pending)} folder browses timed out for album: {album['title']}")
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ranked = futures[future]
+                    username = ranked.username
+                    try:
+                        # Get all files in the folder
+                        directory_files = future.result()
+                        if not directory_files:
+                            continue
+
+                        # Find matching tracks
+                        matching_files = self.track_matcher.find_matching_tracks(
+                            album['tracks'],
+                            directory_files,
+                            self.downloader.allowed_filetypes
+                        )
+                    except Exception as e:
+                        self.logger.warning(f"Error processing files from {username}: {str(e)}")
                         continue
-                    
-                    # Find matching tracks
-                    matching_files = self.track_matcher.find_matching_tracks(
-                        album['tracks'],
-                        directory_files,
-                        self.downloader.allowed_filetypes
-                    )
 
                     # Log found files for debugging
                     if matching_files:
@@ -172,84 +423,113 @@ class DownloadManager:
                         for track_id, file in matching_files.items():
                             self.logger.debug(f"  - Track ID: {track_id} -> {file.filename}")
 
-                    if matching_files and len(matching_files) > best_match_count:
-                        best_directory_path = directory_path
-                        best_result = result
-                        best_match_count = len(matching_files)
-                        best_files = matching_files.values()
-                        for track_id, file in matching_files.items():
-                            self.status_tracker.update_track_status(track_id,DownloadStatus.PENDING,None,file.filename)
-
-                except Exception as e:
-                    self.logger.warning(f"Error processing files from {result.username}: {str(e)}")
-                    continue
-
-            # Start downloading the best result
-            self.logger.debug(matching_files)
-            if best_result and best_match_count > 0:
-                self.logger.info(f"Starting download with {best_result.username} ({best_match_count} files)")
-                self.status_tracker.db.set_album_source_username(album['id'], best_result.username)
-                return self.downloader.start_download(best_result.username, best_directory_path, best_files)
-
-            self.logger.warning(f"No match found for album: {album['title']}")
-            return False
-
-        except Exception as e:
-            self.logger.error(f"Error starting download: {str(e)}")
-            self.logger.exception("Full stack trace:")
-            return False
-
-    def _check_download_status(self, album: dict) -> None:
+                    if not matching_files:
+                        continue
+                    candidate = SlskAlbumCandidate(username, ranked.directory, matching_files, ranked.score, ranked.queue_length)
+                    candidates.append(candidate)
+                    if not best_candidate or (candidate.match_count, candidate.score) > (best_candidate.match_count, best_candidate.score):
+                        best_candidate = candidate
+
+                # Alternates are kept so failed tracks can be downloaded from another peer
+                if best_candidate and best_candidate.match_count >= wanted_count and len(candidates) > Config.SLSKD_FAILOVER_SOURCES:
+                    self.logger.info(f"Complete match found with {best_candidate.username} and {len(candidates) - 1} alternates, skipping {len(pending)} remaining browses")
+                    break
+        finally:
+            for future in pending:
+                future.cancel()
+
+        candidates.sort(key=lambda c: (c.match_count, c.score), reverse=True)
+        return candidates
+
+    def _check_download_status(self, album: dict, snapshot: Optional[TransferSnapshot] = None) -> None:
         """Vérifie l'état d'un téléchargement en cours."""
         try:
             # Get files from the folder
+            if snapshot is None:
+                snapshot = self.transfers.current()
             album_folder = self.filesystem.extract_filename(album['title'])
-            files = self.downloader.get_directory_files_status(album_folder)
+            files = list(self.downloader.get_directory_files_status(album_folder, snapshot))
+            # Add files requested from other sources (missing or failed tracks)
+            file_ids = {file.get('id') for file in files}
+            for candidate in self._get_album_candidates(album['id']):
+                for file in snapshot.get_source_files(candidate.username, candidate.directory):
+                    if file.get('id') not in file_ids:
+                        file_ids.add(file.get('id'))
+                        files.append(file)
             if not files:
                 return
 
             # Get tracks and their status
             tracks = self.status_tracker.get_tracks_status(album['id'])
             completed_tracks = 0
+            failed_tracks = 0
             total_tracks = len(tracks)
 
+            # Index the files by name once; a retried file hides its failed transfer
+            files_by_name = {}
+            for file in files:
+                file_name = self.filesystem.extract_filename(file['filename'])
+                known = files_by_name.get(file_name)
+                if known is None or self._transfer_preference(file) > self._transfer_preference(known):
+                    files_by_name[file_name] = file
+
+            # Tracks are reconciled with the file they were requested as
+            matched = {}
+            for track_id, track_info in tracks.items():
+                file = files_by_name.get(track_info['slsk_id']) if track_info['slsk_id'] else None
+                if file:
+                    matched[track_id] = (file, track_info['slsk_id'])
+
+            # Name matching only for requested tracks and files left on both sides
+            unmatched_tracks = {track_id: info for track_id, info in tracks.items() if info['slsk_id'] and track_id not in matched}
+            if unmatched_tracks:
+                claimed = {file_name for _, file_name in matched.values()}
+                remaining_files = {name: file for name, file in files_by_name.items() if name not in claimed}
+                if remaining_files:
+                    matched.update(self._match_remaining_files(unmatched_tracks, remaining_files))
+
+            for track_id, (file, file_name) in matched.items():
+                track_info = tracks[track_id]
+                self.logger.debug(f"File status for track {track_id}: {file['state']}")
+                # Only transitions are written, once per monitor tick
+                if file['state'] == 'Completed, Succeeded':
+                    self.status_tracker.stage_track_status(
+                        track_id,
+                        DownloadStatus.COMPLETED,
+                        self._local_path(file['filename']),
+                        file_name,
+                        current=track_info
+                    )
+                    completed_tracks += 1
+                elif file['state'] == 'InProgress':
+                    self.status_tracker.stage_track_status(
+                        track_id,
+                        DownloadStatus.DOWNLOADING,
+                        None,
+                        file_name,
+                        current=track_info
+                    )
+                elif SlskdFileState.is_completed_with_error(file['state']):
+                    # Tracks already without any other source are not retried
+                    if track_info['status'] == DownloadStatus.ERROR.value or not self._failover_track(album, track_id, file):
+                        failed_tracks += 1
+
+            # Tracks no source had when the download started end the album as failed
             for track_id, track_info in tracks.items():
-                self.logger.debug(f"Matching for track {track_id}: {track_info['title']} in downloads list.")
-                for file in files:
-                    file_name = self.filesystem.extract_filename(file['filename'])
-                    normalized_path = self.filesystem.normalize_path(file['filename'])
-                    local_path = f"{os.path.basename(os.path.dirname(normalized_path))}/{os.path.basename(normalized_path)}"
-
-                    ratio = self.track_matcher.compare_track_names(f"{track_info['title']}.fakeext", file_name)
-
-                    if file_name == track_info['slsk_id']:
-                        self.logger.debug(f"File status: {file['state']}")
-                        if file['state'] == 'Completed, Succeeded':
-                            self.status_tracker.update_track_status(
-                                track_id,
-                                DownloadStatus.COMPLETED,
-                                local_path,
-                                track_info['slsk_id']
-                            )
-                            completed_tracks += 1
-                        elif file['state'] == 'InProgress':
-                            self.status_tracker.update_track_status(
-                                track_id,
-                                DownloadStatus.DOWNLOADING,
-                                None,
-                                track_info['slsk_id']
-                            )
-                        elif 'Completed' in file['state'] and 'Error' in file['state']:
-                            self.status_tracker.update_track_status(track_id, DownloadStatus.ERROR, None,
-                                track_info['slsk_id'])
-                        break
-                        
-
-           
+                if track_info['slsk_id'] or track_info['status'] == DownloadStatus.COMPLETED.value:
+                    continue
+                if track_info['status'] == DownloadStatus.ERROR.value or not self._source_missing_track(album, track_id):
+                    failed_tracks += 1
+
             self.logger.debug(f"Total files: {len(files)}")
 
             # Update album status
-            self.status_tracker.update_album_progress(album, completed_tracks, total_tracks)
+            self.status_tracker.update_album_progress(album, completed_tracks, total_tracks, failed_tracks)
+            if completed_tracks + failed_tracks == total_tracks:
+                # Write the final state before post-processing and before the scheduler looks at it
+                self.status_tracker.flush()
+                # A download slot is free again
+                self.queue_events.notify('download_manager', f"album {album['title']} finished")
 
             # Process the album if it is complete
             if completed_tracks == total_tracks:
@@ -257,10 +537,90 @@ class DownloadManager:
                 for downloadedFile in files:
                     self.downloader.remove_download(downloadedFile['username'], downloadedFile['id'], )
                     # self.downloader.clear_completed_downloads()
+                self.status_tracker.db.delete_source_candidates(album['id'])
 
         except Exception as e:
             self.logger.error(f"Error checking status: {str(e)}")
 
+    def _match_remaining_files(self, tracks: Dict[str, Dict], files_by_name: Dict[str, Dict]) -> Dict[str, tuple]:
+        """Rattache par similarité de nom les pistes sans fichier à leur slsk_id aux fichiers restants.
+
+        Returns:
+            Dictionnaire {track_id: (fichier, nom du fichier)}
+        """
+        directory = SlskDirectory(
+            name='transfers',
+            file_count=len(files_by_name),
+            files=[SlskFile.from_response({'filename': name, 'size': file.get('size', 0)}) for name, file in files_by_name.items()]
+        )
+        wanted = [{'id': track_id, 'title': info['title']} for track_id, info in tracks.items()]
+        matches = self.track_matcher.find_matching_tracks(wanted, directory, self.downloader.allowed_filetypes)
+        for track_id, slsk_file in matches.items():
+            self.logger.info(f"Track {track_id} has no transfer named '{tracks[track_id]['slsk_id']}', matched by name to '{slsk_file.filename}'")
+        return {track_id: (files_by_name[slsk_file.filename], slsk_file.filename) for track_id, slsk_file in matches.items()}
+
+    def _transfer_preference(self, file: Dict) -> tuple:
+        """Ordre de préférence des transferts d'un même fichier : sans erreur, puis le plus récent."""
+        # slskd dates share one ISO format, so they sort as strings
+        return (not SlskdFileState.is_completed_with_error(file.get('state', '')), file.get('requestedAt') or '')
+
+    def _local_path(self, filename: str) -> str:
+        """Chemin d'un fichier téléchargé relatif au dossier de téléchargement (dossier/fichier)."""
+        normalized_path = self.filesystem.normalize_path(filename)
+        return f"{os.path.basename(os.path.dirname(normalized_path))}/{os.path.basename(normalized_path)}"
+
+    def _source_missing_track(self, album: dict, track_id: str) -> bool:
+        """Demande une piste jamais demandée à la première source connue qui la possède.
+
+        Sans source, la piste passe en erreur pour que l'album puisse se terminer.
+
+        Returns:
+            True si la piste a été demandée, False si aucune source ne la propose
+        """
+        for candidate in self._get_album_candidates(album['id']):
+            file = candidate.matching_files.get(track_id)
+            if file and self._enqueue_tracks(candidate, {track_id: file}):
+                self.logger.info(f"Track {track_id} had no source, downloading it from {candidate.username}")
+                return True
+
+        self.logger.warning(f"No source for track {track_id} of album {album['title']}")
+        self.status_tracker.update_track_status(track_id, DownloadStatus.ERROR, None, None)
+        return False
+
+    def _failover_track(self, album: dict, track_id: str, failed_file: Dict) -> bool:
+        """Télécharge une piste en échec depuis la meilleure source suivante qui la possède.
+
+        Lorsque plus aucune source ne la propose, le pair en échec est blacklisté pour l'album.
+
+        Returns:
+            True si la piste a été redemandée à une autre source, False si les sources sont épuisées
+        """
+        failed_username = failed_file.get('username')
+        for candidate in self._get_album_candidates(album['id']):
+            if candidate.username == failed_username:
+                # This source no longer offers the track
+                self.status_tracker.db.remove_source_candidate_track(album['id'], candidate.username, candidate.directory, track_id)
+                continue
+            file = candidate.matching_files.get(track_id)
+            if file and self._enqueue_tracks(candidate, {track_id: file}):
+                self.logger.info(f"Track {track_id} failed from {failed_username} ({failed_file['state']}), downloading it from {candidate.username}")
+                self.downloader.remove_download(failed_username, failed_file.get('id'))
+                return True
+
+        self.logger.warning(f"No other source for track {track_id} of album {album['title']}, blacklisting {failed_username}")
+        self.status_tracker.update_track_status(track_id, DownloadStatus.ERROR, None, self.filesystem.extract_filename(failed_file['filename']))
+        if failed_username:
+            self.status_tracker.db.add_blacklisted_source(album['id'], failed_username)
+        return False
+
+    def _get_album_candidates(self, album_id: str, excluded_users: Sequence[str] = ()) -> List[SlskAlbumCandidate]:
+        """Récupère les sources classées et non expirées d'un album."""
+        return [
+            SlskAlbumCandidate.from_dict(candidate)
+            for candidate in self.status_tracker.db.get_source_candidates(album_id)
+            if candidate['username'] not in excluded_users and candidate['files']
+        ]
+
     def cancel_album(self, album_id: str) -> None:
         """Annule le téléchargement d'un album, blacklist la source et supprime les downloads slsk."""
         username = self.status_tracker.db.get_album_source_username(album_id)
@@ -274,5 +634,6 @@ class DownloadManager:
             self.downloader.remove_download(file.get('username'), file.get('id'))
         # Cancel on DB and blacklist
         self.status_tracker.cancel_download(album_id)
+        self.queue_events.notify('download_manager', f"album {album_id} cancelled")
         if username:
             self.status_tracker.db.add_blacklisted_source(album_id, username)
\ No newline at end of file
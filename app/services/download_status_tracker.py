@@ -1,25 +1,119 @@
+import threading
+from collections import OrderedDict
 from app.database import Database, DownloadStatus
 from app.utils.logger import setup_logger
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 class DownloadStatusTracker:
+    # Number of tracks and albums whose last known state is kept in memory
+    MAX_KNOWN_STATES = 10000
+
     def __init__(self, database: Database):
         self.db = database
         self.logger = setup_logger('download_tracker', 'downloads.log')
+        # Last state written or read from the database
+        self._track_states: OrderedDict = OrderedDict()
+        self._album_states: OrderedDict = OrderedDict()
+        # Transitions waiting for the next flush()
+        self._pending_tracks: Dict[str, Tuple[DownloadStatus, Optional[str], Optional[str]]] = {}
+        self._pending_albums: Dict[str, DownloadStatus] = {}
+        self._lock = threading.Lock()
 
     def update_album_status(self, album_id: str, status: DownloadStatus) -> None:
         """Met à jour le statut d'un album."""
         self.db.update_album_status(album_id, status)
+        with self._lock:
+            self._pending_albums.pop(album_id, None)
+            self._remember(self._album_states, album_id, status.value)
         self.logger.info(f"Album status updated: {status} (ID: {album_id})")
 
     def update_track_status(self, track_id: str, status: DownloadStatus, local_path: Optional[str] = None, slsk_id: Optional[str] = None) -> None:
         """Met à jour le statut d'une piste."""
         self.db.update_track_status(track_id, status, local_path, slsk_id)
+        with self._lock:
+            self._pending_tracks.pop(track_id, None)
+            self._remember(self._track_states, track_id, {'status': status.value, 'local_path': local_path, 'slsk_id': slsk_id})
+
+    def stage_track_status(self, track_id: str, status: DownloadStatus, local_path: Optional[str] = None,
+                           slsk_id: Optional[str] = None, current: Optional[Dict] = None) -> bool:
+        """Prépare le changement de statut d'une piste, écrit au prochain flush().
+
+        Args:
+            current: État lu en base (status, local_path, slsk_id), à défaut le dernier état connu
+
+        Returns:
+            True si le statut diffère de l'état connu
+        """
+        with self._lock:
+            known = current if current is not None else self._track_states.get(track_id)
+            if known and known.get('status') == status.value and known.get('slsk_id') == slsk_id \
+                    and (status != DownloadStatus.COMPLETED or known.get('local_path') == local_path):
+                self._pending_tracks.pop(track_id, None)
+                self._remember(self._track_states, track_id, dict(known))
+                return False
+            self._pending_tracks[track_id] = (status, local_path, slsk_id)
+            return True
+
+    def stage_album_status(self, album_id: str, status: DownloadStatus, current: Optional[str] = None) -> bool:
+        """Prépare le changement de statut d'un album, écrit au prochain flush().
+
+        Returns:
+            True si le statut diffère de l'état connu
+        """
+        with self._lock:
+            known = current if current is not None else self._album_states.get(album_id)
+            if known == status.value:
+                self._pending_albums.pop(album_id, None)
+                self._remember(self._album_states, album_id, known)
+                return False
+            self._pending_albums[album_id] = status
+            return True
+
+    def flush(self) -> int:
+        """Écrit en une transaction tous les changements de statut préparés.
+
+        Returns:
+            Nombre de pistes et d'albums mis à jour
+        """
+        with self._lock:
+            tracks, self._pending_tracks = self._pending_tracks, {}
+            albums, self._pending_albums = self._pending_albums, {}
+        if not tracks and not albums:
+            return 0
+
+        try:
+            self.db.apply_status_changes(tracks, albums)
+        except Exception:
+            # Forget what was assumed about these rows, they are read again next time
+            with self._lock:
+                for track_id in tracks:
+                    self._track_states.pop(track_id, None)
+                for album_id in albums:
+                    self._album_states.pop(album_id, None)
+            raise
+
+        with self._lock:
+            for track_id, (status, local_path, slsk_id) in tracks.items():
+                self._remember(self._track_states, track_id, {'status': status.value, 'local_path': local_path, 'slsk_id': slsk_id})
+            for album_id, status in albums.items():
+                self._remember(self._album_states, album_id, status.value)
+        self.logger.debug(f"Flushed {len(tracks)} track and {len(albums)} album status changes")
+        return len(tracks) + len(albums)
+
+    def _remember(self, states: OrderedDict, key: str, state) -> None:
+        states[key] = state
+        states.move_to_end(key)
+        while len(states) > self.MAX_KNOWN_STATES:
+            states.popitem(last=False)
 
     def get_album_status(self, album_id: str) -> tuple:
         """Récupère le statut d'un album."""
         return self.db.get_album_status(album_id)
 
+    def get_album_statuses(self, album_ids: List[str]) -> Dict[str, tuple]:
+        """Récupère en une requête le statut de plusieurs albums, indexé par identifiant."""
+        return self.db.get_album_statuses(album_ids)
+
     def get_tracks_status(self, album_id: str) -> Dict:
         """Récupère le statut des pistes d'un album."""
         return self.db.get_tracks_status(album_id)
@@ -32,14 +126,25 @@ class DownloadStatusTracker:
         """Récupère tous les albums en cours de téléchargement."""
         return self.db.get_downloading_albums()
 
-    def update_album_progress(self, album: dict, completed_tracks: int, total_tracks: int) -> None:
-        """Met à jour le statut d'un album en fonction de sa progression."""
+    def update_album_progress(self, album: dict, completed_tracks: int, total_tracks: int, failed_tracks: int = 0) -> None:
+        """Prépare le statut d'un album en fonction de sa progression (écrit au prochain flush())."""
         if completed_tracks == total_tracks:
-            self.update_album_status(album['id'], DownloadStatus.COMPLETED)
-            self.logger.info(f"Album {album['title']} completed ({completed_tracks}/{total_tracks} tracks)")
+            status = DownloadStatus.COMPLETED
+            message = f"Album {album['title']} completed ({completed_tracks}/{total_tracks} tracks)"
+        elif failed_tracks and completed_tracks + failed_tracks == total_tracks:
+            status = DownloadStatus.ERROR
+            message = f"Album {album['title']} failed ({failed_tracks}/{total_tracks} tracks without source)"
         else:
-            self.update_album_status(album['id'], DownloadStatus.DOWNLOADING)
-            self.logger.info(f"Album {album['title']} in progress ({completed_tracks}/{total_tracks} tracks)")
+            status = DownloadStatus.DOWNLOADING
+            message = f"Album {album['title']} in progress ({completed_tracks}/{total_tracks} tracks)"
+
+        if self.stage_album_status(album['id'], status, album.get('status')):
+            if status == DownloadStatus.ERROR:
+                self.logger.warning(message)
+            else:
+                self.logger.info(message)
+        else:
+            self.logger.debug(message)
 
     def cancel_download(self, album_id: str) -> None:
         """Annule le téléchargement d'un album."""
@@ -62,4 +167,12 @@ class DownloadStatusTracker:
                  disc: Optional[str] = None, year: Optional[str] = None, albumartist: Optional[str] = None) -> None:
         """Ajoute une piste à la base de données avec tous les tags utiles."""
         self.db.add_track(track_id, album_id, title, position, length, artist, album_name, track_num, disc, year, albumartist)
-        self.logger.info(f"Track added: {title} (ID: {track_id})")
\ No newline at end of file
+        self.logger.info(f"Track added: {title} (ID: {track_id})")
+
+    def add_albums(self, artist_id: str, artist_name: str, albums: List[Dict], keep_statuses: tuple = ()) -> None:
+        """Ajoute un artiste et plusieurs albums en attente, avec leurs pistes, en une seule transaction.
+
+        Les albums existants dont le statut figure dans keep_statuses ne sont pas remis en attente.
+        """
+        self.db.upsert_albums(artist_id, artist_name, albums, keep_statuses)
+        self.logger.info(f"{len(albums)} albums added for artist {artist_name} (ID: {artist_id})")
\ No newline at end of file
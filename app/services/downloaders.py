@@ -1,6 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Union
-import unicodedata
+from typing import Callable, Dict, Iterator, List, Union
 import slskd_api
 import time
 import difflib
@@ -9,6 +8,8 @@ from enum import Enum
 import os
 from typing import List, Dict, Optional
 from .slsk_models import SlskDirectory, SlskFile, SlskSearchResult
+from .search_cache import SearchResultCache
+from .transfer_snapshot import TransferSnapshot
 from app.config.settings import Config
 
 class SlskdFileState(Enum):
@@ -54,7 +55,7 @@ class Downloader(ABC):
         pass
         
     @abstractmethod
-    def search(self, query: str) -> List[Dict]:
+    def search(self, query: str, force_refresh: bool = False, is_sufficient: Optional[Callable] = None) -> List[Dict]:
         """Effectue une recherche"""
         pass
         
@@ -84,6 +85,9 @@ class SlskdDownloader(Downloader):
     def __init__(self):
         super().__init__()
         self.client = None
+        self.browse_client = None
+        self.search_cache: Optional[SearchResultCache] = None
+        self.search_poll_interval = 0.5
         self.logger = setup_logger('slskd_downloader', 'downloads.log')
         self.ignored_users = Config.SLSKD_IGNORED_USERS
         self.allowed_filetypes = ["mp3", "flac"]
@@ -96,23 +100,62 @@ class SlskdDownloader(Downloader):
                 api_key=api_key,
                 url_base=url_base
             )
+            # Folder browses get their own client so a slow peer cannot hold a browse thread
+            self.browse_client = slskd_api.SlskdClient(
+                host=host_url,
+                api_key=api_key,
+                url_base=url_base,
+                timeout=Config.SLSKD_BROWSE_TIMEOUT
+            )
             self.logger.info(f"Slskd successfully configured on {host_url}")
         except Exception as e:
             self.logger.error(f"Error configuring Slskd: {str(e)}")
             raise
             
-    def search(self, query: str) -> List[SlskSearchResult]:
+    def search(self, query: str, force_refresh: bool = False,
+               is_sufficient: Optional[Callable[[SlskSearchResult], bool]] = None) -> List[SlskSearchResult]:
         """Effectue une recherche.
         
         Args:
             query: Le texte à rechercher
+            force_refresh: Ignore les résultats en cache et relance la recherche
+            is_sufficient: Si fourni, la recherche est arrêtée dès qu'un résultat le satisfait
             
         Returns:
             Liste des résultats de recherche sous forme d'objets SlskSearchResult
         """
         if not self.client:
             raise ValueError("Slskd n'est pas configuré")
-            
+
+        if self.search_cache and not force_refresh:
+            cached_results = self.search_cache.get(query)
+            if cached_results:
+                return [SlskSearchResult.from_response(result) for result in cached_results]
+
+        raw_results = []
+        stopped_early = False
+        responses = self.iter_search_responses(query)
+        try:
+            for raw_result in responses:
+                raw_results.append(raw_result)
+                if is_sufficient and is_sufficient(SlskSearchResult.from_response(raw_result)):
+                    self.logger.info(f"Sufficient result from {raw_result.get('username')}, stopping search: {query}")
+                    stopped_early = True
+                    break
+        finally:
+            responses.close()
+
+        # Only complete searches are cached: a retry must see every peer
+        if self.search_cache and raw_results and not stopped_early:
+            self.search_cache.set(query, raw_results)
+        # Convert results to SlskSearchResult objects
+        return [SlskSearchResult.from_response(result) for result in raw_results]
+
+    def iter_search_responses(self, query: str) -> Iterator[Dict]:
+        """Lance une recherche et retourne les réponses brutes au fur et à mesure de leur arrivée.
+
+        Si le générateur est fermé avant la fin, la recherche est arrêtée côté Slskd.
+        """
         search = self.client.searches.search_text(
             searchText=query,
             searchTimeout=5000,
@@ -122,17 +165,29 @@ class SlskdDownloader(Downloader):
             minimumResponseFileCount=1,
             responseLimit=10
         )
-        
-        # Wait for the search to finish
-        while True:
-            search_state = self.client.searches.state(search['id'])
-            if search_state['state'] != 'InProgress':
-                break
-            time.sleep(1)
-            
-        # Convert results to SlskSearchResult objects
-        raw_results = self.client.searches.search_responses(search['id'])
-        return [SlskSearchResult.from_response(result) for result in raw_results]
+
+        seen_users = set()
+        in_progress = True
+        try:
+            while in_progress:
+                search_state = self.client.searches.state(search['id'])
+                in_progress = search_state['state'] == 'InProgress'
+                # Only fetch responses once new ones are available
+                if not in_progress or search_state.get('responseCount', 0) > len(seen_users):
+                    for response in self.client.searches.search_responses(search['id']):
+                        if response['username'] in seen_users:
+                            continue
+                        seen_users.add(response['username'])
+                        yield response
+                if in_progress:
+                    time.sleep(self.search_poll_interval)
+        finally:
+            if in_progress:
+                # Free slskd resources when the caller stops early
+                try:
+                    self.client.searches.stop(search['id'])
+                except Exception as e:
+                    self.logger.warning(f"Error stopping search: {str(e)}")
         
     def get_directory_content(self, username: str, directory: str) -> SlskDirectory:
         """Récupère le contenu d'un répertoire.
@@ -141,7 +196,7 @@ class SlskdDownloader(Downloader):
             Une liste de fichiers convertis en objets SlskFile
         """
         self.logger.debug(f"Searching in folder \"{directory}\" for user: {username}")
-        response = self.client.users.directory(username=username, directory=directory)
+        response = self.browse_client.users.directory(username=username, directory=directory)
         if not isinstance(response, list):
             self.logger.warning(f"Unexpected response from directory(): {type(response)}")
             return []
@@ -227,43 +282,21 @@ class SlskdDownloader(Downloader):
                     return download, directory
         return None, None
         
-    def get_directory_files_status(self, directory_name: str) -> List[Dict]:
+    def get_directory_files_status(self, directory_name: str, snapshot: Optional[TransferSnapshot] = None) -> List[Dict]:
         """Récupère le statut de tous les fichiers d'un répertoire.
         
         Args:
             directory_name: Le nom du dossier à chercher (dernière partie du chemin)
+            snapshot: Instantané des téléchargements à utiliser, récupéré auprès de Slskd si absent
             
         Returns:
             Liste des fichiers avec leur statut, vide si non trouvé
         """
-        downloads = self.get_downloads_status()
-        self.logger.info(f"Searching for folder containing '{directory_name}' in downloads")
-        self.logger.info(f"Number of active downloads: {len(downloads)}")
-        
-        # Clean the searched name
-        def normalize_str(s):
-            # Replace accented characters with their unaccented equivalent and remove non-alphanumeric characters
-            s = unicodedata.normalize('NFKD', s)
-            s = ''.join(c for c in s if not unicodedata.combining(c))
-            return ''.join(c.lower() for c in s if c.isalnum())
+        if snapshot is None:
+            snapshot = TransferSnapshot(self.get_downloads_status())
+        self.logger.debug(f"Searching for folder containing '{directory_name}' in {snapshot.directory_count} downloaded folders")
 
-        clean_search = normalize_str(directory_name)
-        self.logger.info(f"Cleaned name for search: '{clean_search}'")
-        
-        for download in downloads:
-            self.logger.info(f"Download from {download.get('username', 'unknown')}:" )
-            for directory in download.get('directories', []):
-                dir_path = directory.get('directory', '')
-                self.logger.info(f"  - Folder found: '{dir_path}'")
-                
-                # Clean the target folder name for comparison
-                clean_dir = normalize_str(dir_path)
-                self.logger.info(f"  - Cleaned folder name: '{clean_dir}'")
-                
-                # Check if the searched name is in the folder name
-                if clean_search in clean_dir:
-                    self.logger.info(f"  => Match found! '{dir_path}' contains '{directory_name}'")
-                    return directory.get('files', [])
-                        
-        self.logger.warning(f"No folder found containing '{directory_name}'")
-        return []
\ No newline at end of file
+        files = snapshot.find_directory_files(directory_name)
+        if not files:
+            self.logger.warning(f"No folder found containing '{directory_name}'")
+        return files
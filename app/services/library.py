@@ -1,70 +1,138 @@
-
+import base64
+import json
+from sqlalchemy import and_, case, func, or_
 from app.database import Database, DownloadStatus
 from app.models import Album, Artist, Track
 from datetime import datetime
 
+# Albums without an added date are ordered (and paginated) as if added at this date
+UNKNOWN_ADDED_DATE = datetime(1970, 1, 1)
+
 class LibraryService:
     def __init__(self, database: Database):
         self.db = database
 
     def get_all_albums(self):
-        """Récupère tous les albums de la bibliothèque avec leur statut (ORM)."""
-        session = self.db.session
-        albums = (
-            session.query(Album)
+        """Récupère tous les albums de la bibliothèque avec leur statut, groupés par artiste."""
+        albums, _ = self.get_albums_page()
+        return albums
+
+    def get_albums_page(self, limit=None, cursor=None):
+        """Récupère une page d'albums de la bibliothèque, triés par artiste puis du plus récent au plus ancien.
+
+        Les pistes sont comptées en SQL et la pagination se fait par curseur (keyset) : le curseur
+        renvoyé désigne le dernier album de la page et reste valide si des albums sont ajoutés.
+
+        Args:
+            limit: Nombre maximal d'albums, None pour tous
+            cursor: Curseur renvoyé par la page précédente
+
+        Returns:
+            (albums, curseur de la page suivante ou None)
+
+        Raises:
+            ValueError: Si le curseur ou la limite sont invalides
+        """
+        if limit is not None and limit <= 0:
+            raise ValueError(f"Limite invalide : {limit}")
+        # NULL never compares in the keyset condition: nullable columns are coalesced
+        release_date = func.coalesce(Album.release_date, '')
+        added_date = func.coalesce(Album.added_date, UNKNOWN_ADDED_DATE)
+        # Artists first (grouping), then newest albums; album id makes the order total
+        order = [
+            (Artist.name, False),
+            (Artist.id, False),
+            (release_date, True),
+            (added_date, True),
+            (Album.id, True)
+        ]
+        query = (
+            self._albums_query()
+            .add_columns(Artist.id.label('artist_id'), Artist.name.label('artist_name'))
             .join(Artist, Album.artist_id == Artist.id)
-            .outerjoin(Track, Album.id == Track.album_id)
-            .add_entity(Artist)
-            .add_entity(Track)
-            .all()
+            .group_by(Artist.id)
         )
-        # Regrouper par album
-        album_dict = {}
-        for album, artist, track in albums:
-            if album.id not in album_dict:
-                album_dict[album.id] = {
-                    'id': album.id,
-                    'title': album.title,
-                    'cover_url': album.cover_url,
-                    'status': album.status,
-                    'added_date': album.added_date,
-                    'release_date': album.release_date,
-                    'artist_id': artist.id if artist else None,
-                    'artist_name': artist.name if artist else 'Artiste inconnu',
-                    'total_tracks': 0,
-                    'completed_tracks': 0
-                }
-            album_dict[album.id]['total_tracks'] += 1 if track else 0
-            if track and track.status == DownloadStatus.COMPLETED.value:
-                album_dict[album.id]['completed_tracks'] += 1
-        # Trier par release_date DESC, puis added_date DESC
-        result = sorted(album_dict.values(), key=lambda x: (x['release_date'] or '', x['added_date']), reverse=True)
-        return result
+        if cursor:
+            query = query.filter(self._after(order, self._decode_cursor(cursor)))
+        query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order])
+        if limit:
+            # One extra row tells whether there is a next page
+            query = query.limit(limit + 1)
+
+        albums = [
+            dict(self._album_dict(row), artist_id=row.artist_id, artist_name=row.artist_name)
+            for row in query.all()
+        ]
+        next_cursor = None
+        if limit and len(albums) > limit:
+            albums = albums[:limit]
+            last = albums[-1]
+            next_cursor = self._encode_cursor([
+                last['artist_name'],
+                last['artist_id'],
+                last['release_date'] or '',
+                (last['added_date'] or UNKNOWN_ADDED_DATE).isoformat(),
+                last['id']
+            ])
+        return albums, next_cursor
 
     def get_artist_albums(self, artist_id):
-        """Récupère tous les albums d'un artiste spécifique (ORM)."""
-        session = self.db.session
-        albums = (
-            session.query(Album)
+        """Récupère tous les albums d'un artiste spécifique, du dernier ajouté au premier."""
+        rows = (
+            self._albums_query()
             .filter(Album.artist_id == artist_id)
-            .outerjoin(Track, Album.id == Track.album_id)
-            .add_entity(Track)
+            .order_by(Album.added_date.desc(), Album.id.desc())
             .all()
         )
-        album_dict = {}
-        for album, track in albums:
-            if album.id not in album_dict:
-                album_dict[album.id] = {
-                    'id': album.id,
-                    'title': album.title,
-                    'cover_url': album.cover_url,
-                    'status': album.status,
-                    'added_date': album.added_date,
-                    'total_tracks': 0,
-                    'completed_tracks': 0
-                }
-            album_dict[album.id]['total_tracks'] += 1 if track else 0
-            if track and track.status == DownloadStatus.COMPLETED.value:
-                album_dict[album.id]['completed_tracks'] += 1
-        result = sorted(album_dict.values(), key=lambda x: x['added_date'], reverse=True)
-        return result
\ No newline at end of file
+        return [self._album_dict(row) for row in rows]
+
+    def _albums_query(self):
+        """Albums avec leur nombre de pistes total et terminé, comptés en SQL."""
+        completed = func.coalesce(func.sum(case((Track.status == DownloadStatus.COMPLETED.value, 1), else_=0)), 0)
+        return (
+            self.db.session.query(
+                Album.id,
+                Album.title,
+                Album.cover_url,
+                Album.status,
+                Album.added_date,
+                Album.release_date,
+                func.count(Track.id).label('total_tracks'),
+                completed.label('completed_tracks')
+            )
+            .outerjoin(Track, Album.id == Track.album_id)
+            .group_by(Album.id)
+        )
+
+    def _album_dict(self, row):
+        return {
+            'id': row.id,
+            'title': row.title,
+            'cover_url': row.cover_url,
+            'status': row.status,
+            'added_date': row.added_date,
+            'release_date': row.release_date,
+            'total_tracks': row.total_tracks,
+            'completed_tracks': int(row.completed_tracks)
+        }
+
+    def _after(self, order, values):
+        """Condition « après le curseur » pour un tri sur plusieurs colonnes de sens différents."""
+        conditions = []
+        for i, (column, descending) in enumerate(order):
+            equal_prefix = [order[j][0] == values[j] for j in range(i)]
+            after = column < values[i] if descending else column > values[i]
+            conditions.append(and_(*equal_prefix, after))
+        return or_(*conditions)
+
+    def _encode_cursor(self, values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def _decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            artist_name, artist_id, release_date, added_date, album_id = values
+            added_date = datetime.fromisoformat(added_date) if added_date else UNKNOWN_ADDED_DATE
+            return [artist_name, artist_id, release_date, added_date, album_id]
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Curseur invalide : {cursor}") from e
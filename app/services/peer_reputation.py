@@ -0,0 +1,145 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from app.utils.logger import setup_logger
+from app.services.downloaders import SlskdFileState
+from app.services.transfer_snapshot import TransferSnapshot
+
+class PeerReputationService:
+    """Historique du comportement des pairs Soulseek (débit, délai avant transfert, fiabilité).
+
+    Les statistiques sont mises à jour à partir des instantanés de transferts du
+    moniteur de téléchargements et servent à départager les sources d'un album.
+    """
+
+    # Weight of the latest transfer in the moving averages
+    SMOOTHING = 0.3
+    # Speed and waiting time at which a peer gets half of the matching sub-score
+    REFERENCE_SPEED = 1024 * 1024  # bytes/s
+    REFERENCE_TTFB = 300.0  # seconds
+    WEIGHTS = {
+        'reliability': 0.5,
+        'speed': 0.3,
+        'responsiveness': 0.2
+    }
+
+    def __init__(self, database):
+        self.db = database
+        self.logger = setup_logger('peer_reputation', 'downloads.log')
+
+    def observe(self, snapshot: TransferSnapshot) -> None:
+        """Prend en compte les transferts terminés depuis la dernière observation de chaque pair."""
+        finished: Dict[str, List[Dict]] = {}
+        for username, file in snapshot.iter_files():
+            state = file.get('state', '')
+            # Cancellations are ours (failover, album cancel), they say nothing about the peer
+            if not state.startswith('Completed') or state == SlskdFileState.COMPLETED_CANCELLED.value:
+                continue
+            ended_at = self._parse_date(file.get('endedAt'))
+            if ended_at is None:
+                continue
+            finished.setdefault(username, []).append(dict(file, endedAt=ended_at))
+
+        if not finished:
+            return
+
+        known = self.db.get_peer_stats(finished.keys())
+        now = datetime.utcnow()
+        updates = {}
+        for username, files in finished.items():
+            stats = known.get(username) or {
+                'completed_count': 0,
+                'error_count': 0,
+                'bytes_downloaded': 0,
+                'avg_speed': None,
+                'avg_ttfb': None,
+                'last_transfer_end': None
+            }
+            watermark = stats['last_transfer_end']
+            new_files = sorted(
+                (f for f in files if watermark is None or f['endedAt'] > watermark),
+                key=lambda f: f['endedAt']
+            )
+            if not new_files:
+                continue
+
+            for file in new_files:
+                self._record_transfer(stats, file)
+            stats['last_transfer_end'] = new_files[-1]['endedAt']
+            stats['last_seen'] = now
+            updates[username] = stats
+            self.logger.debug(
+                f"Peer {username}: {stats['completed_count']} completed, {stats['error_count']} errors, "
+                f"speed={stats['avg_speed']}, ttfb={stats['avg_ttfb']}"
+            )
+
+        if updates:
+            self.db.save_peer_stats(updates)
+            self.logger.info(f"Updated statistics of {len(updates)} peers")
+
+    def get_reputations(self, usernames: Iterable[str]) -> Dict[str, float]:
+        """Retourne la réputation (0 à 1) de chaque pair, 0.5 pour un pair inconnu."""
+        usernames = list(dict.fromkeys(usernames))
+        try:
+            known = self.db.get_peer_stats(usernames)
+        except Exception as e:
+            self.logger.warning(f"Could not load peer statistics: {str(e)}")
+            known = {}
+        return {username: self.reputation(known.get(username)) for username in usernames}
+
+    def reputation(self, stats: Optional[Dict]) -> float:
+        """Combine fiabilité, débit et délai avant transfert en une note de 0 à 1."""
+        stats = stats or {}
+        completed = stats.get('completed_count') or 0
+        errors = stats.get('error_count') or 0
+        # Laplace smoothing: an unknown peer starts at 0.5
+        reliability = (completed + 1) / (completed + errors + 2)
+
+        avg_speed = stats.get('avg_speed')
+        speed = avg_speed / (avg_speed + self.REFERENCE_SPEED) if avg_speed else 0.5
+
+        avg_ttfb = stats.get('avg_ttfb')
+        responsiveness = 1 / (1 + avg_ttfb / self.REFERENCE_TTFB) if avg_ttfb is not None else 0.5
+
+        return (
+            self.WEIGHTS['reliability'] * reliability
+            + self.WEIGHTS['speed'] * speed
+            + self.WEIGHTS['responsiveness'] * responsiveness
+        )
+
+    def _record_transfer(self, stats: Dict, file: Dict) -> None:
+        if file.get('state') != SlskdFileState.COMPLETED.value:
+            stats['error_count'] += 1
+            return
+
+        stats['completed_count'] += 1
+        stats['bytes_downloaded'] += int(file.get('bytesTransferred') or file.get('size') or 0)
+
+        speed = file.get('averageSpeed')
+        if speed:
+            stats['avg_speed'] = self._smooth(stats['avg_speed'], float(speed))
+
+        requested_at = self._parse_date(file.get('requestedAt'))
+        started_at = self._parse_date(file.get('startedAt'))
+        if requested_at and started_at and started_at >= requested_at:
+            stats['avg_ttfb'] = self._smooth(stats['avg_ttfb'], (started_at - requested_at).total_seconds())
+
+    def _smooth(self, average: Optional[float], value: float) -> float:
+        if average is None:
+            return value
+        return (1 - self.SMOOTHING) * average + self.SMOOTHING * value
+
+    @staticmethod
+    def _parse_date(value) -> Optional[datetime]:
+        """Convertit une date Slskd (ISO 8601, UTC, jusqu'à 7 décimales) en datetime naïf."""
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            return value
+        try:
+            value = value.rstrip('Z').split('+')[0]
+            if '.' in value:
+                base, fraction = value.split('.', 1)
+                value = f"{base}.{fraction[:6]}"
+            return datetime.fromisoformat(value)
+        except (ValueError, AttributeError):
+            return None
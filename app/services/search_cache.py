@@ -0,0 +1,34 @@
+import json
+from typing import Dict, List, Optional
+from app.utils.logger import setup_logger
+from app.utils.text import normalize_query
+
+class SearchResultCache:
+    """Met en cache dans Redis les réponses des recherches Slskd, par requête normalisée."""
+
+    def __init__(self, redis_client, cache_expiration: int):
+        self.redis_client = redis_client
+        self.cache_expiration = cache_expiration
+        self.logger = setup_logger('search_cache', 'downloads.log')
+
+    def _cache_key(self, query: str) -> str:
+        return f"slsk_search:{normalize_query(query)}"
+
+    def get(self, query: str) -> Optional[List[Dict]]:
+        """Retourne les réponses brutes en cache pour cette requête, None si absentes."""
+        try:
+            cached = self.redis_client.get(self._cache_key(query))
+        except Exception as e:
+            self.logger.warning(f"Search cache unavailable: {str(e)}")
+            return None
+        if not cached:
+            return None
+        self.logger.info(f"Search cache hit: {query}")
+        return json.loads(cached)
+
+    def set(self, query: str, responses: List[Dict]) -> None:
+        """Enregistre les réponses brutes d'une recherche."""
+        try:
+            self.redis_client.setex(self._cache_key(query), self.cache_expiration, json.dumps(responses))
+        except Exception as e:
+            self.logger.warning(f"Unable to cache search results: {str(e)}")
@@ -0,0 +1,105 @@
+import difflib
+import re
+from functools import lru_cache
+from typing import List
+import numpy as np
+
+TRACK_NUMBER_PATTERN = re.compile(r'^\d+[\s.-]+')
+AUDIO_EXTENSION_PATTERN = re.compile(r'\.(mp3|flac|wav|aac|ogg|m4a)$', re.IGNORECASE)
+SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s.]')
+
+@lru_cache(maxsize=16384)
+def clean_track_name(name: str) -> str:
+    """Nettoie un nom de piste ou de fichier pour la comparaison (résultat mis en cache)."""
+    # Remove track numbers at the start (e.g., "01 -" or "1.")
+    name = TRACK_NUMBER_PATTERN.sub('', name)
+    # Remove known audio extension (mp3, flac, wav, etc.)
+    name = AUDIO_EXTENSION_PATTERN.sub('', name)
+    # Remove special characters and convert to lowercase
+    name = SPECIAL_CHARS_PATTERN.sub('', name.lower())
+    return name.strip()
+
+@lru_cache(maxsize=16384)
+def char_ngrams(clean_name: str, n: int = 3) -> tuple:
+    """N-grammes de caractères d'un nom nettoyé (résultat mis en cache)."""
+    # Padding gives weight to the start and end of short names
+    padded = f" {clean_name} "
+    if len(padded) <= n:
+        return (padded,)
+    return tuple(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+class RatioSimilarity:
+    """Ratio difflib.SequenceMatcher entre noms nettoyés, l'échelle de SLSKD_MIN_MATCH_RATIO."""
+
+    name = 'ratio'
+
+    def score(self, name1: str, name2: str) -> float:
+        return difflib.SequenceMatcher(None, clean_track_name(name1), clean_track_name(name2)).ratio()
+
+    def matrix(self, rows: List[str], cols: List[str], minimum: float = 0.0) -> List[List[float]]:
+        """Scores de toutes les paires, 0 pour celles qui ne dépassent pas minimum."""
+        clean_cols = [clean_track_name(c) for c in cols]
+        scores = []
+        for row in rows:
+            clean_row = clean_track_name(row)
+            row_scores = []
+            for clean_col in clean_cols:
+                matcher = difflib.SequenceMatcher(None, clean_col, clean_row)
+                # Cheap upper bounds first, the full ratio is only computed when it can pass
+                if matcher.real_quick_ratio() <= minimum or matcher.quick_ratio() <= minimum:
+                    row_scores.append(0.0)
+                    continue
+                ratio = matcher.ratio()
+                row_scores.append(ratio if ratio > minimum else 0.0)
+            scores.append(row_scores)
+        return scores
+
+class NgramSimilarity:
+    """Similarité cosinus de vecteurs de n-grammes de caractères, calculée en un produit matriciel."""
+
+    name = 'ngram'
+
+    def __init__(self, n: int = 3):
+        self.n = n
+
+    def score(self, name1: str, name2: str) -> float:
+        return self.matrix([name1], [name2])[0][0]
+
+    def matrix(self, rows: List[str], cols: List[str], minimum: float = 0.0) -> List[List[float]]:
+        """Scores de toutes les paires, 0 pour celles qui ne dépassent pas minimum."""
+        if not rows or not cols:
+            return [[] for _ in rows]
+        row_grams = [char_ngrams(clean_track_name(r), self.n) for r in rows]
+        col_grams = [char_ngrams(clean_track_name(c), self.n) for c in cols]
+
+        vocabulary = {}
+        for grams in row_grams + col_grams:
+            for gram in grams:
+                vocabulary.setdefault(gram, len(vocabulary))
+        row_vectors = self._vectors(row_grams, vocabulary)
+        col_vectors = self._vectors(col_grams, vocabulary)
+
+        scores = row_vectors @ col_vectors.T
+        scores[scores <= minimum] = 0.0
+        return scores.tolist()
+
+    def _vectors(self, grams_list: List[tuple], vocabulary: dict) -> np.ndarray:
+        vectors = np.zeros((len(grams_list), len(vocabulary)), dtype=np.float32)
+        for i, grams in enumerate(grams_list):
+            for gram in grams:
+                vectors[i, vocabulary[gram]] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+SIMILARITY_BACKENDS = {
+    RatioSimilarity.name: RatioSimilarity,
+    NgramSimilarity.name: NgramSimilarity
+}
+
+def create_similarity(name: str = 'ratio'):
+    """Crée le backend de similarité configuré (TRACK_MATCH_SIMILARITY)."""
+    try:
+        return SIMILARITY_BACKENDS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown similarity backend '{name}', expected one of: {', '.join(SIMILARITY_BACKENDS)}")
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 @dataclass
@@ -70,6 +70,17 @@ class SlskFile:
             length=response.get('length')
         )
 
+    def to_dict(self) -> dict:
+        """Retourne le fichier sous la forme d'une réponse Soulseek (voir from_response)."""
+        return {
+            'filename': self.filename,
+            'size': self.size,
+            'extension': self.extension,
+            'bitRate': self.bit_rate,
+            'isVariableBitRate': self.is_variable_bit_rate,
+            'length': self.length
+        }
+
     def get_dir_name(self) -> str:
         return "\\".join(self.filename.split("\\")[:-1])
 
@@ -151,12 +162,13 @@ class SlskSearchResult:
     def from_response(cls, response: dict) -> 'SlskSearchResult':
         """Crée une instance à partir d'une réponse Soulseek."""
         files = [SlskFile.from_response(f) for f in response.get('files', [])]
+        # slskd uses camelCase keys (hasFreeUploadSlot, uploadSpeed, queueLength)
         return cls(
             username=response['username'],
             files=files,
-            free_upload_slots=response.get('slots_free', False),
-            upload_speed=response.get('speed', 0),
-            queue_length=response.get('queue_length', 0),
+            free_upload_slots=response.get('hasFreeUploadSlot', response.get('slots_free', False)),
+            upload_speed=response.get('uploadSpeed', response.get('speed', 0)),
+            queue_length=response.get('queueLength', response.get('queue_length', 0)),
             has_slots=response.get('has_slots', False)
         )
     
@@ -173,6 +185,13 @@ class SlskSearchResult:
             files = [f for f in files if f.size_mb <= max_size_mb]
         return files
     
+    def group_by_directory(self, files: Optional[List[SlskFile]] = None) -> Dict[str, List[SlskFile]]:
+        """Regroupe les fichiers (tous par défaut) par dossier parent."""
+        directories: Dict[str, List[SlskFile]] = {}
+        for file in self.files if files is None else files:
+            directories.setdefault(file.get_dir_name(), []).append(file)
+        return directories
+
     def get_best_quality_files(self) -> List[SlskFile]:
         """Retourne les fichiers avec la meilleure qualité basée sur la taille."""
         if not self.files:
@@ -203,4 +222,43 @@ class SlskSearchResult:
         """Retourne une représentation détaillée du résultat."""
         return (f"SlskSearchResult(username='{self.username}', files_count={len(self.files)}, "
                 f"free_upload_slots={self.free_upload_slots}, upload_speed={self.upload_speed}, "
-                f"queue_length={self.queue_length}, has_slots={self.has_slots})")
\ No newline at end of file
+                f"queue_length={self.queue_length}, has_slots={self.has_slots})")
+
+@dataclass
+class SlskAlbumCandidate:
+    """Représente un dossier d'un pair Soulseek retenu comme source pour un album."""
+    username: str
+    directory: str
+    matching_files: Dict[str, SlskFile]
+    score: float = 0.0
+    queue_length: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SlskAlbumCandidate':
+        """Crée une instance à partir de sa forme sérialisée (voir to_dict)."""
+        return cls(
+            username=data['username'],
+            directory=data['directory'],
+            matching_files={track_id: SlskFile.from_response(f) for track_id, f in data['files'].items()},
+            score=data.get('score') or 0.0,
+            queue_length=data.get('queue_length') or 0
+        )
+
+    def to_dict(self) -> dict:
+        """Retourne le candidat sous une forme sérialisable en JSON."""
+        return {
+            'username': self.username,
+            'directory': self.directory,
+            'score': self.score,
+            'queue_length': self.queue_length,
+            'files': {track_id: f.to_dict() for track_id, f in self.matching_files.items()}
+        }
+
+    @property
+    def match_count(self) -> int:
+        """Retourne le nombre de pistes trouvées dans le dossier."""
+        return len(self.matching_files)
+
+    def __str__(self) -> str:
+        """Retourne une représentation lisible du candidat."""
+        return f"{self.username}: {self.directory} ({self.match_count} tracks, score: {self.score:.2f})"
@@ -1,39 +1,37 @@
-import difflib
-import re
-from typing import List, Dict
+from dataclasses import dataclass
+from typing import List, Dict, Optional
 from app.utils.logger import setup_logger
+from app.utils.assignment import max_weight_assignment
+from app.services.similarity import RatioSimilarity, clean_track_name
 from app.services.slsk_models import SlskDirectory, SlskFile
 
+@dataclass
+class TrackMatch:
+    """Correspondance entre une piste voulue et un fichier, avec son score de similarité."""
+    track_id: str
+    file: SlskFile
+    score: float
+
 class TrackMatcher:
     """Classe responsable de la correspondance entre les pistes recherchées et trouvées."""
-    
-    def __init__(self, minimum_ratio: float = 0.5):
+
+    # Share of the match score given to duration agreement when both durations are known
+    DURATION_WEIGHT = 0.3
+
+    def __init__(self, minimum_ratio: float = 0.5, similarity=None, duration_tolerance: float = 10.0):
         self.minimum_ratio = minimum_ratio
+        self.similarity = similarity or RatioSimilarity()
+        self.duration_tolerance = duration_tolerance
         self.logger = setup_logger('track_matcher', 'track_matcher.log')
-        self.logger.debug(f'Init TrackMatcher with a ratio of {minimum_ratio}')
+        self.logger.debug(f'Init TrackMatcher with a ratio of {minimum_ratio} ({self.similarity.name} similarity, duration tolerance {duration_tolerance}s)')
 
     def compare_track_names(self, name1: str, name2: str) -> float:
         """Compare deux noms de pistes et retourne leur ratio de similarité."""
-        # Clean names
-        clean1 = self._clean_track_name(name1)
-        clean2 = self._clean_track_name(name2)
-        
-        # Compute similarity ratio
-        ratio = difflib.SequenceMatcher(None, clean1, clean2).ratio()
-        return ratio
+        return self.similarity.score(name1, name2)
 
     def _clean_track_name(self, name: str) -> str:
         """Nettoie un nom de piste pour la comparaison."""
-        # Remove track numbers at the start (e.g., "01 -" or "1.")
-        name = re.sub(r'^\d+[\s.-]+', '', name)
-
-        # Remove known audio extension (mp3, flac, wav, etc.)
-        name = re.sub(r'\.(mp3|flac|wav|aac|ogg|m4a)$', '', name, flags=re.IGNORECASE)
-
-        # Remove special characters and convert to lowercase
-        name = re.sub(r'[^\w\s.]', '', name.lower())
-
-        return name.strip()
+        return clean_track_name(name)
 
     def find_matching_tracks(self, wanted_tracks: List[Dict], available_files: SlskDirectory, allowed_extensions: List[str]) -> Dict[str, SlskFile]:
         """Trouve les fichiers correspondant aux pistes voulues.
@@ -46,40 +44,76 @@ class TrackMatcher:
         Returns:
             Dictionnaire avec l'ID de la piste voulue comme clé et le fichier correspondant comme valeur
         """
-        matching_files: Dict[str, SlskFile] = {}
-        matched_tracks = set()  # To avoid duplicates
-        
+        return {match.track_id: match.file for match in self.find_track_matches(wanted_tracks, available_files, allowed_extensions)}
+
+    def find_track_matches(self, wanted_tracks: List[Dict], available_files: SlskDirectory, allowed_extensions: List[str]) -> List[TrackMatch]:
+        """Associe pistes voulues et fichiers en maximisant la similarité totale.
+
+        La matrice de similarité est calculée une seule fois puis l'affectation est résolue de
+        façon optimale : un fichier n'est jamais pris par une piste au détriment d'une autre
+        qui lui correspond mieux. Seules les paires au-dessus du ratio minimal sont retenues.
+
+        Quand les deux durées sont connues, une paire dont l'écart dépasse la tolérance est
+        écartée avant la comparaison des noms, et l'accord des durées entre dans le score.
+
+        Returns:
+            Liste des correspondances (piste, fichier, score) dans l'ordre des pistes voulues
+        """
         # Filter first by extension
-        valid_files = [f for f in available_files.get_audio_files() if f.extension.lower() in [ext.lower().strip('.') for ext in allowed_extensions]]
+        extensions = {ext.lower().strip('.') for ext in allowed_extensions}
+        valid_files = [f for f in available_files.get_audio_files() if f.extension.lower() in extensions]
         self.logger.debug(f"Valid files in folder {available_files.name}: {valid_files}")
-        
-        for track in wanted_tracks:
-            track_id = track.get('id')
-            track_title = track.get('title', '')
-            if not track_title or not track_id:
-                continue
-                
-            best_match = None
-            best_ratio = self.minimum_ratio
-            
-            for file in valid_files:
-                # Avoid already matched files
-                if file in matching_files.values():
-                    continue
-                    
-                ratio = self.compare_track_names(file.filename, track_title)
-                if ratio > best_ratio:
-                    best_ratio = ratio
-                    best_match = file
-            
-            if best_match and best_match not in matching_files.values():
-                self.logger.info(f"Match found: Track ID '{track_id}' - '{track_title}' -> '{best_match.filename}' (ratio: {best_ratio:.2f})")
-                matching_files[track_id] = best_match
-                matched_tracks.add(track_title)
-        
-        # Log tracks not found
-        unmatched = [t.get('title') for t in wanted_tracks if t.get('title') not in matched_tracks]
+
+        tracks = [t for t in wanted_tracks if t.get('id') and t.get('title')]
+        if not tracks or not valid_files:
+            self._log_unmatched(wanted_tracks, set())
+            return []
+
+        # Duration prefilter: tracks and files without any compatible counterpart are not compared by name
+        durations = [[self._duration_agreement(track, f) for f in valid_files] for track in tracks]
+        track_indexes = [i for i, row in enumerate(durations) if any(d != 0.0 for d in row)]
+        file_indexes = [j for j in range(len(valid_files)) if any(durations[i][j] != 0.0 for i in track_indexes)]
+        if len(track_indexes) < len(tracks) or len(file_indexes) < len(valid_files):
+            self.logger.debug(f"Duration prefilter kept {len(track_indexes)}/{len(tracks)} tracks and {len(file_indexes)}/{len(valid_files)} files")
+        tracks = [tracks[i] for i in track_indexes]
+        durations = [[durations[i][j] for j in file_indexes] for i in track_indexes]
+        valid_files = [valid_files[j] for j in file_indexes]
+        if not tracks or not valid_files:
+            self._log_unmatched(wanted_tracks, set())
+            return []
+
+        # All pairs are scored in one batch, names are cleaned once and cached
+        scores = self.similarity.matrix([t['title'] for t in tracks], [f.filename for f in valid_files], self.minimum_ratio)
+        for row_scores, row_durations in zip(scores, durations):
+            for j, agreement in enumerate(row_durations):
+                if agreement is not None and row_scores[j] > 0:
+                    row_scores[j] = (1 - self.DURATION_WEIGHT) * row_scores[j] + self.DURATION_WEIGHT * agreement if agreement > 0 else 0.0
+
+        matches = []
+        for track_index, file_index in max_weight_assignment(scores):
+            track = tracks[track_index]
+            match = TrackMatch(track['id'], valid_files[file_index], scores[track_index][file_index])
+            self.logger.info(f"Match found: Track ID '{match.track_id}' - '{track['title']}' -> '{match.file.filename}' (ratio: {match.score:.2f})")
+            matches.append(match)
+
+        self._log_unmatched(wanted_tracks, {match.track_id for match in matches})
+        return matches
+
+    def _duration_agreement(self, track: Dict, file: SlskFile) -> Optional[float]:
+        """Accord des durées d'une piste (ms) et d'un fichier (s), entre 0 et 1.
+
+        Returns:
+            None si l'une des durées est inconnue, 0 si l'écart dépasse la tolérance
+        """
+        if not track.get('length') or not file.length or self.duration_tolerance <= 0:
+            return None
+        difference = abs(track['length'] / 1000 - file.length)
+        if difference > self.duration_tolerance:
+            return 0.0
+        # Durations are rounded to the second on Soulseek, 1s apart is still a perfect agreement
+        return 1.0 - max(difference - 1, 0) / self.duration_tolerance
+
+    def _log_unmatched(self, wanted_tracks: List[Dict], matched_ids: set) -> None:
+        unmatched = [t.get('title') or '' for t in wanted_tracks if t.get('id') not in matched_ids]
         if unmatched:
             self.logger.warning(f"Tracks not found: {', '.join(unmatched)}")
-            
-        return matching_files
\ No newline at end of file
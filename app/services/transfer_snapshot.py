@@ -0,0 +1,113 @@
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from app.utils.logger import setup_logger
+from app.utils.text import normalize_query, normalize_str
+
+class TransferSnapshot:
+    """Vue indexée de tous les téléchargements Slskd à un instant donné."""
+
+    def __init__(self, downloads: List[Dict]):
+        self.downloads = downloads if isinstance(downloads, list) else []
+        self.created_at = time.monotonic()
+        # Normalized folder name (last path component) -> files of each folder with this name
+        self._by_folder: Dict[str, List[List[Dict]]] = {}
+        # Normalized full folder path -> files of each folder with this path
+        self._by_path: Dict[str, List[List[Dict]]] = {}
+        # Word of a folder path -> normalized paths containing it, in slskd order (used for partial matches)
+        self._paths_by_word: Dict[str, Dict[str, None]] = {}
+        # (username, remote folder path) -> files
+        self._by_source: Dict[Tuple[str, str], List[Dict]] = {}
+        # Remote folder paths as reported by slskd
+        self._paths = set()
+
+        for download in self.downloads:
+            if not isinstance(download, dict):
+                continue
+            username = download.get('username', '')
+            for directory in download.get('directories', []):
+                dir_path = directory.get('directory', '')
+                files = directory.get('files', [])
+                folder_name = re.split(r'[\\/]', dir_path)[-1]
+                clean_path = normalize_str(dir_path)
+                self._by_folder.setdefault(normalize_str(folder_name), []).append(files)
+                self._by_path.setdefault(clean_path, []).append(files)
+                for word in normalize_query(dir_path).split():
+                    self._paths_by_word.setdefault(word, {})[clean_path] = None
+                self._by_source[(username, dir_path)] = files
+                self._paths.add(dir_path)
+
+    @property
+    def directory_count(self) -> int:
+        return len(self._by_path)
+
+    def has_directory(self, directory_name: str) -> bool:
+        """Vérifie si un dossier dont le chemin est exactement celui-ci est en cours de téléchargement."""
+        # Exact, unnormalized comparison: a folder of another artist with the same title must not match
+        return directory_name in self._paths
+
+    def find_directory_files(self, directory_name: str) -> List[Dict]:
+        """Récupère les fichiers des dossiers portant ce nom, chez tous les pairs.
+
+        À défaut, retourne ceux du premier chemin (dans l'ordre de Slskd) qui contient le nom
+        recherché : seuls les chemins contenant chacun de ses mots sont comparés.
+
+        Args:
+            directory_name: Le nom du dossier à chercher (dernière partie du chemin)
+
+        Returns:
+            Liste des fichiers avec leur statut, vide si non trouvé
+        """
+        clean_search = normalize_str(directory_name)
+        if not clean_search:
+            return []
+        folders = self._by_folder.get(clean_search)
+        if folders is None:
+            folders = self._find_path(directory_name, clean_search)
+        return [file for files in folders for file in files]
+
+    def _find_path(self, directory_name: str, clean_search: str) -> List[List[Dict]]:
+        postings = [self._paths_by_word.get(word, {}) for word in normalize_query(directory_name).split()]
+        if not postings:
+            return []
+        # The rarest word gives the fewest paths to compare, still in slskd order
+        for clean_path in min(postings, key=len):
+            if clean_search in clean_path and all(clean_path in posting for posting in postings):
+                return self._by_path[clean_path]
+        return []
+
+    def get_source_files(self, username: str, directory: str) -> List[Dict]:
+        """Récupère les fichiers téléchargés depuis un dossier précis d'un pair."""
+        return self._by_source.get((username, directory), [])
+
+    def iter_files(self) -> Iterator[Tuple[str, Dict]]:
+        """Parcourt tous les fichiers de l'instantané avec le pair qui les envoie."""
+        for (username, _), files in self._by_source.items():
+            for file in files:
+                yield username, file
+
+class TransferSnapshotService:
+    """Récupère une seule fois par cycle la liste des téléchargements Slskd et la partage."""
+
+    def __init__(self, fetch_downloads: Callable[[], List[Dict]]):
+        self.fetch_downloads = fetch_downloads
+        self._snapshot: Optional[TransferSnapshot] = None
+        self._lock = threading.Lock()
+        self.logger = setup_logger('transfer_snapshot', 'downloads.log')
+
+    def refresh(self) -> TransferSnapshot:
+        """Interroge Slskd et remplace l'instantané courant."""
+        snapshot = TransferSnapshot(self.fetch_downloads())
+        with self._lock:
+            self._snapshot = snapshot
+        self.logger.debug(f"Transfer snapshot refreshed: {snapshot.directory_count} folders")
+        return snapshot
+
+    def current(self, max_age: float = 1.0) -> TransferSnapshot:
+        """Retourne l'instantané courant, rafraîchi s'il a plus de max_age secondes."""
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot.created_at > max_age:
+            snapshot = self.refresh()
+        return snapshot
@@ -0,0 +1,76 @@
+from typing import List, Sequence, Tuple
+
+def max_weight_assignment(weights: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    """Affectation optimale lignes/colonnes maximisant la somme des poids (algorithme hongrois).
+
+    La matrice peut être rectangulaire : chaque ligne et chaque colonne est affectée au plus une
+    fois. Les paires de poids nul ou négatif ne sont pas retournées (poids 0 = paire interdite).
+    Complexité O(n² m) avec n = min(lignes, colonnes).
+
+    Returns:
+        Liste de paires (ligne, colonne)
+    """
+    rows = len(weights)
+    cols = len(weights[0]) if rows else 0
+    if not rows or not cols:
+        return []
+
+    # The solver needs rows <= columns
+    transposed = rows > cols
+    if transposed:
+        weights = [[weights[r][c] for r in range(rows)] for c in range(cols)]
+        rows, cols = cols, rows
+
+    # Minimize (max - weight), with negative weights clamped to 0 (forbidden)
+    max_weight = max(max(row) for row in weights)
+    cost = [[max_weight - max(0.0, w) for w in row] for row in weights]
+
+    # Potentials and matching, 1-indexed with a virtual column 0
+    INF = float('inf')
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (cols + 1)
+    match = [0] * (cols + 1)  # column -> row
+    way = [0] * (cols + 1)
+    for row in range(1, rows + 1):
+        match[0] = row
+        col0 = 0
+        min_slack = [INF] * (cols + 1)
+        used = [False] * (cols + 1)
+        while True:
+            used[col0] = True
+            row0 = match[col0]
+            delta = INF
+            col1 = 0
+            cost_row = cost[row0 - 1]
+            u_row0 = u[row0]
+            for col in range(1, cols + 1):
+                if not used[col]:
+                    slack = cost_row[col - 1] - u_row0 - v[col]
+                    if slack < min_slack[col]:
+                        min_slack[col] = slack
+                        way[col] = col0
+                    if min_slack[col] < delta:
+                        delta = min_slack[col]
+                        col1 = col
+            for col in range(cols + 1):
+                if used[col]:
+                    u[match[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_slack[col] -= delta
+            col0 = col1
+            if match[col0] == 0:
+                break
+        # Augmenting path
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+
+    pairs = []
+    for col in range(1, cols + 1):
+        row = match[col]
+        if not row or weights[row - 1][col - 1] <= 0:
+            continue
+        pairs.append((col - 1, row - 1) if transposed else (row - 1, col - 1))
+    return sorted(pairs)
@@ -0,0 +1,17 @@
+import unicodedata
+from functools import lru_cache
+
+# Folder and file names come back on every search and monitor tick
+@lru_cache(maxsize=16384)
+def normalize_str(s: str) -> str:
+    """Supprime les accents et les caractères non alphanumériques, puis met en minuscules."""
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join(c for c in s if not unicodedata.combining(c))
+    return ''.join(c.lower() for c in s if c.isalnum())
+
+@lru_cache(maxsize=4096)
+def normalize_query(s: str) -> str:
+    """Normalise une requête de recherche : sans accents, en minuscules, ponctuation réduite à un espace."""
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join(c for c in s if not unicodedata.combining(c)).casefold()
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in s).split())
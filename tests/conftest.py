@@ -0,0 +1,26 @@
+import os
+import tempfile
+import pytest
+
+# The app reads its configuration on import: tests never touch a configured database
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='lidseek-tests-'), 'lidseek.db')
+
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app.database import Database
+from app.db import create_db_engine
+from app.migrate import run_migrations
+from app.models import Base
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'lidseek.db'}")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def database(engine):
+    sessions = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
+    yield Database(sessions)
+    sessions.remove()
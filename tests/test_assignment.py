@@ -0,0 +1,44 @@
+import itertools
+import random
+import pytest
+from app.utils.assignment import max_weight_assignment
+
+def _brute_force(weights):
+    """Meilleure somme des poids positifs sur toutes les affectations partielles."""
+    rows, cols = len(weights), len(weights[0])
+    best = 0.0
+    for assigned_cols in itertools.permutations(range(cols), min(rows, cols)):
+        for assigned_rows in itertools.permutations(range(rows), min(rows, cols)):
+            best = max(best, sum(max(0.0, weights[r][c]) for r, c in zip(assigned_rows, assigned_cols)))
+    return best
+
+def _check(weights, pairs):
+    assert len({r for r, _ in pairs}) == len(pairs)
+    assert len({c for _, c in pairs}) == len(pairs)
+    assert all(weights[r][c] > 0 for r, c in pairs)
+    return sum(weights[r][c] for r, c in pairs)
+
+@pytest.mark.parametrize('seed', range(60))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    rows, cols = rng.randint(1, 5), rng.randint(1, 5)
+    # Integer weights give ties, zeros (forbidden pairs) and negative weights
+    weights = [[rng.choice([rng.randint(-3, 10), 0, rng.random()]) for _ in range(cols)] for _ in range(rows)]
+    assert _check(weights, max_weight_assignment(weights)) == pytest.approx(_brute_force(weights))
+
+def test_empty_and_forbidden_matrices():
+    assert max_weight_assignment([]) == []
+    assert max_weight_assignment([[]]) == []
+    assert max_weight_assignment([[0, 0], [0, 0]]) == []
+    assert max_weight_assignment([[-1.0, -2.0]]) == []
+
+def test_prefers_total_over_greedy_choice():
+    # Greedy would pair (0, 0) and leave row 1 with nothing
+    weights = [[10, 9], [8, 0]]
+    assert sorted(max_weight_assignment(weights)) == [(0, 1), (1, 0)]
+
+def test_rectangular_matrices_keep_original_indexes():
+    weights = [[1, 5, 2, 0], [4, 1, 0, 3]]
+    assert sorted(max_weight_assignment(weights)) == [(0, 1), (1, 0)]
+    transposed = [list(column) for column in zip(*weights)]
+    assert sorted(max_weight_assignment(transposed)) == [(0, 1), (1, 0)]
@@ -0,0 +1,95 @@
+from app.database import DownloadStatus
+
+def _album(album_id, title=None, track_count=2):
+    return {
+        'id': album_id,
+        'title': title or album_id,
+        'tracks': [{'id': f"{album_id}-{i}", 'title': f"Track {i}", 'position': i} for i in range(track_count)]
+    }
+
+def _status(database, album_id):
+    return database.get_album_status(album_id)[2]
+
+def test_upsert_keeps_listed_statuses(database):
+    database.upsert_albums('artist', 'Artist', [_album('completed'), _album('downloading'), _album('failed')])
+    database.update_album_status('completed', DownloadStatus.COMPLETED)
+    database.update_album_status('downloading', DownloadStatus.DOWNLOADING)
+    database.update_album_status('failed', DownloadStatus.ERROR)
+
+    database.upsert_albums(
+        'artist', 'Renamed artist',
+        [_album('completed', 'New title'), _album('downloading'), _album('failed'), _album('new')],
+        keep_statuses=(DownloadStatus.COMPLETED, DownloadStatus.DOWNLOADING)
+    )
+
+    assert _status(database, 'completed') == DownloadStatus.COMPLETED.value
+    assert _status(database, 'downloading') == DownloadStatus.DOWNLOADING.value
+    assert _status(database, 'failed') == DownloadStatus.PENDING.value
+    assert _status(database, 'new') == DownloadStatus.PENDING.value
+    # Other columns are still updated on kept albums
+    assert database.get_album_status('completed')[1] == 'New title'
+
+def test_upsert_without_keep_statuses_requeues_everything(database):
+    database.upsert_albums('artist', 'Artist', [_album('album')])
+    database.update_album_status('album', DownloadStatus.COMPLETED)
+    database.upsert_albums('artist', 'Artist', [_album('album')])
+    assert _status(database, 'album') == DownloadStatus.PENDING.value
+
+def test_upsert_keeps_track_statuses(database):
+    database.upsert_albums('artist', 'Artist', [_album('album')])
+    database.update_track_status('album-0', DownloadStatus.COMPLETED, '/music/0.flac', '0.flac')
+    database.upsert_albums('artist', 'Artist', [_album('album')], keep_statuses=(DownloadStatus.COMPLETED,))
+    assert database.get_tracks_status('album')['album-0']['status'] == DownloadStatus.COMPLETED.value
+
+def test_upsert_deduplicates_rows_of_a_batch(database):
+    # The same album twice in one batch is upserted once
+    database.upsert_albums('artist', 'Artist', [_album('album', 'First'), _album('album', 'Second')])
+    assert database.get_album_status('album')[1] == 'Second'
+
+def _progress(database, album_id):
+    return database.get_album_status(album_id)[3:]
+
+def test_progress_counters_follow_track_statuses(database):
+    database.upsert_albums('artist', 'Artist', [_album('album', track_count=3)])
+    assert _progress(database, 'album') == (3, 0)
+
+    database.update_track_status('album-0', DownloadStatus.COMPLETED, '/music/0.flac', '0.flac')
+    assert _progress(database, 'album') == (3, 1)
+    # Completing a completed track again does not count it twice
+    database.update_track_status('album-0', DownloadStatus.COMPLETED, '/music/0.flac', '0.flac')
+    assert _progress(database, 'album') == (3, 1)
+
+    database.apply_status_changes(
+        {
+            'album-1': (DownloadStatus.COMPLETED, '/music/1.flac', '1.flac'),
+            'album-2': (DownloadStatus.ERROR, None, '2.flac'),
+            'unknown': (DownloadStatus.COMPLETED, None, None)
+        },
+        {'album': DownloadStatus.DOWNLOADING}
+    )
+    assert _progress(database, 'album') == (3, 2)
+
+    # A completed track downloaded again leaves the count
+    database.update_track_status('album-1', DownloadStatus.PENDING)
+    assert _progress(database, 'album') == (3, 1)
+
+def test_requeue_recounts_tracks(database):
+    database.upsert_albums('artist', 'Artist', [_album('album', track_count=2)])
+    database.update_track_status('album-0', DownloadStatus.COMPLETED, '/music/0.flac', '0.flac')
+    database.upsert_albums('artist', 'Artist', [_album('album', track_count=4)])
+    assert _progress(database, 'album') == (4, 1)
+
+def test_recount_repairs_counters(database, engine):
+    database.upsert_albums('artist', 'Artist', [_album('first', track_count=2), _album('second', track_count=1)])
+    database.update_track_status('second-0', DownloadStatus.COMPLETED, '/music/0.flac', '0.flac')
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE albums SET total_tracks = 9, completed_tracks = 9")
+
+    assert database.recount_album_progress(['first']) == 1
+    database.session.commit()
+    assert _progress(database, 'first') == (2, 0)
+    assert _progress(database, 'second') == (9, 9)
+
+    assert database.recount_album_progress() == 2
+    database.session.commit()
+    assert _progress(database, 'second') == (1, 1)
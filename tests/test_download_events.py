@@ -0,0 +1,77 @@
+import threading
+import time
+import pytest
+from flask import Flask
+from app.config.settings import Config
+from app.routes.event_routes import init_routes
+from app.services.download_events import DownloadDirectoryWatcher, DownloadEventBus
+
+def test_wait_consumes_pending_events():
+    bus = DownloadEventBus()
+    bus.notify('test')
+    bus.notify('test')
+    assert bus.wait(0) is True
+    assert bus.wait(0) is False
+
+def test_event_received_after_wake_up_is_kept_for_next_wait():
+    bus = DownloadEventBus()
+    bus.notify('test', 'first')
+    assert bus.wait(0)
+    bus.notify('test', 'second')
+    assert bus.wait(0)
+
+def test_wait_is_woken_by_another_thread():
+    bus = DownloadEventBus()
+    threading.Timer(0.1, bus.notify, args=('test',)).start()
+    start = time.monotonic()
+    assert bus.wait(5)
+    assert time.monotonic() - start < 5
+
+@pytest.fixture
+def watched(tmp_path):
+    bus = DownloadEventBus()
+    watcher = DownloadDirectoryWatcher(bus, str(tmp_path), ['flac', 'mp3'])
+    assert watcher.start()
+    yield bus, tmp_path
+    watcher.stop()
+
+def test_watcher_signals_downloaded_audio_file(watched):
+    bus, directory = watched
+    album = directory / 'Artist - Album'
+    album.mkdir()
+    (album / '01 - Intro.flac').write_bytes(b'\0' * 1024)
+    assert bus.wait(5)
+
+def test_watcher_ignores_folders_and_other_files(watched):
+    bus, directory = watched
+    (directory / 'Artist - Album').mkdir()
+    (directory / 'Artist - Album' / 'cover.jpg').write_bytes(b'\0')
+    (directory / 'Artist - Album' / 'rip.log').write_text('log')
+    assert not bus.wait(1)
+
+def test_watcher_is_disabled_without_download_folder(tmp_path):
+    watcher = DownloadDirectoryWatcher(DownloadEventBus(), str(tmp_path / 'missing'), ['flac'])
+    assert not watcher.start()
+
+@pytest.fixture(scope='module')
+def webhook():
+    # The blueprint is module level, its routes can only be initialized once
+    bus = DownloadEventBus()
+    app = Flask(__name__)
+    app.register_blueprint(init_routes(bus))
+    return bus, app.test_client()
+
+def test_slskd_webhook_wakes_the_monitor(webhook, monkeypatch):
+    bus, client = webhook
+    monkeypatch.setattr(Config, 'SLSKD_WEBHOOK_API_KEY', '')
+    response = client.post('/events/slskd', json={'type': 'DownloadFileComplete'})
+    assert response.status_code == 200
+    assert bus.wait(0)
+
+def test_slskd_webhook_checks_api_key(webhook, monkeypatch):
+    bus, client = webhook
+    monkeypatch.setattr(Config, 'SLSKD_WEBHOOK_API_KEY', 'secret')
+    assert client.post('/events/slskd', json={}, headers={'X-API-Key': 'wrong'}).status_code == 401
+    assert not bus.wait(0)
+    assert client.post('/events/slskd', json={}, headers={'X-API-Key': 'secret'}).status_code == 200
+    assert bus.wait(0)
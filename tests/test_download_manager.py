@@ -0,0 +1,67 @@
+from collections import Counter
+import pytest
+from app.config.settings import Config
+from app.database import DownloadStatus
+from app.services.download_manager import DownloadManager
+from app.services.slsk_models import SlskAlbumCandidate, SlskFile
+
+class FakeDownloader:
+    def __init__(self, failing_users=()):
+        self.failing_users = set(failing_users)
+        self.requests = []
+
+    def start_download(self, username, directory, files):
+        if username in self.failing_users:
+            return False
+        self.requests.append((username, [file.filename for file in files]))
+        return True
+
+    def get_downloads_status(self):
+        return []
+
+def _file(name):
+    return SlskFile(filename=name, size=1, extension='flac', attributes=[], speed=0, queue_length=0, slots_free=True)
+
+def _candidate(username, track_ids, score=1.0):
+    return SlskAlbumCandidate(username, f"{username}\\album", {track_id: _file(f"{track_id}.flac") for track_id in track_ids}, score)
+
+@pytest.fixture
+def album(database):
+    tracks = [{'id': f"track-{i}", 'title': f"Track {i}"} for i in range(3)]
+    database.upsert_albums('artist', 'Artist', [{'id': 'album', 'title': 'Album', 'tracks': tracks}])
+    return {'id': 'album', 'title': 'Album', 'tracks': tracks}
+
+def _manager(database, downloader):
+    manager = DownloadManager(database)
+    manager.configure_downloader(downloader)
+    return manager
+
+def test_missing_tracks_are_requested_from_other_peers(database, album):
+    downloader = FakeDownloader()
+    manager = _manager(database, downloader)
+    peer_load = Counter()
+    candidates = [_candidate('alice', ['track-0', 'track-1']), _candidate('bob', ['track-2'])]
+
+    assert manager._start_album_download(album, candidates, peer_load)
+    assert downloader.requests == [('alice', ['track-0.flac', 'track-1.flac']), ('bob', ['track-2.flac'])]
+    assert peer_load == Counter({'alice': 1, 'bob': 1})
+
+def test_missing_tracks_respect_peer_limit(database, album, monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_CONCURRENT_ALBUM_DOWNLOADS_PER_PEER', 1)
+    downloader = FakeDownloader()
+    manager = _manager(database, downloader)
+    peer_load = Counter({'bob': 1})
+    candidates = [_candidate('alice', ['track-0', 'track-1']), _candidate('bob', ['track-2'])]
+
+    assert manager._start_album_download(album, candidates, peer_load)
+    assert downloader.requests == [('alice', ['track-0.flac', 'track-1.flac'])]
+    assert peer_load == Counter({'alice': 1, 'bob': 1})
+
+def test_no_missing_track_is_requested_when_the_album_fails(database, album):
+    downloader = FakeDownloader(failing_users=['alice'])
+    manager = _manager(database, downloader)
+    candidates = [_candidate('alice', ['track-0', 'track-1']), _candidate('bob', ['track-2'])]
+
+    assert not manager._start_album_download(album, candidates, Counter())
+    assert downloader.requests == []
+    assert database.get_album_status('album')[2] == DownloadStatus.ERROR.value
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models import Album, Artist
+from app.services.library import LibraryService
+
+@pytest.fixture
+def library(database):
+    session = database.session
+    session.add_all([Artist(id='artist-b', name='Beta'), Artist(id='artist-a', name='Alpha')])
+    added = datetime(2024, 1, 1)
+    albums = [
+        ('album-1', 'artist-a', '2001-01-01', added),
+        ('album-2', 'artist-a', '2001-01-01', added),
+        ('album-3', 'artist-a', '1999-05-01', None),
+        ('album-4', 'artist-a', None, None),
+        ('album-5', 'artist-a', None, added + timedelta(days=1)),
+        ('album-6', 'artist-b', '2010-01-01', None),
+        ('album-7', 'artist-b', '2010-01-01', added)
+    ]
+    for album_id, artist_id, release_date, added_date in albums:
+        session.add(Album(id=album_id, artist_id=artist_id, title=album_id, release_date=release_date))
+    session.flush()
+    for album_id, _, _, added_date in albums:
+        # Legacy rows without an added date
+        session.get(Album, album_id).added_date = added_date
+    session.commit()
+    return LibraryService(database)
+
+def test_albums_are_grouped_by_artist_then_newest_first(library):
+    albums, next_cursor = library.get_albums_page()
+    assert next_cursor is None
+    assert [album['artist_name'] for album in albums] == ['Alpha'] * 5 + ['Beta'] * 2
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 7, 10])
+def test_pages_follow_each_other_without_gaps_or_duplicates(library, limit):
+    expected, _ = library.get_albums_page()
+    pages = []
+    cursor = None
+    while True:
+        albums, cursor = library.get_albums_page(limit=limit, cursor=cursor)
+        assert len(albums) <= limit
+        pages.extend(album['id'] for album in albums)
+        if cursor is None:
+            break
+    assert pages == [album['id'] for album in expected]
+
+def test_cursor_after_album_without_added_date_is_valid(library):
+    albums, _ = library.get_albums_page()
+    index = next(i for i, album in enumerate(albums) if album['added_date'] is None)
+    page, cursor = library.get_albums_page(limit=index + 1)
+    assert page[-1]['added_date'] is None
+    following, _ = library.get_albums_page(limit=len(albums), cursor=cursor)
+    assert [album['id'] for album in following] == [album['id'] for album in albums[index + 1:]]
+
+def test_invalid_cursor_and_limit_are_rejected(library):
+    with pytest.raises(ValueError):
+        library.get_albums_page(limit=2, cursor='not-a-cursor')
+    with pytest.raises(ValueError):
+        library.get_albums_page(limit=0)
+    with pytest.raises(ValueError):
+        library.get_albums_page(limit=-1)
+
+def test_album_track_counts(library, database):
+    database.upsert_albums('artist-a', 'Alpha', [{'id': 'album-1', 'title': 'album-1', 'tracks': [{'id': 't1', 'title': 'One'}, {'id': 't2', 'title': 'Two'}]}])
+    album = next(album for album in library.get_artist_albums('artist-a') if album['id'] == 'album-1')
+    assert (album['total_tracks'], album['completed_tracks']) == (2, 0)
@@ -0,0 +1,69 @@
+import threading
+from sqlalchemy import inspect, text
+from app.db import create_db_engine
+from app.migrate import MIGRATIONS, run_migrations, schema_migrations
+from app.models import Base
+
+def _engine(tmp_path):
+    return create_db_engine(f"sqlite:///{tmp_path / 'lidseek.db'}")
+
+def _versions(engine):
+    with engine.connect() as connection:
+        return sorted(connection.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version)).scalars())
+
+def test_fresh_database_is_created_and_migrated(tmp_path):
+    engine = _engine(tmp_path)
+    run_migrations(engine, Base.metadata)
+    assert set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+    assert _versions(engine) == sorted(m['version'] for m in MIGRATIONS)
+
+def test_migrations_run_twice(tmp_path):
+    engine = _engine(tmp_path)
+    run_migrations(engine, Base.metadata)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO artists (id, name) VALUES ('artist', 'Artist')"))
+    run_migrations(engine, Base.metadata)
+    assert _versions(engine) == sorted(m['version'] for m in MIGRATIONS)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM artists")).scalar() == 1
+
+def test_old_schema_is_upgraded(tmp_path):
+    engine = _engine(tmp_path)
+    Base.metadata.create_all(bind=engine)
+    # Schema of the first release: no migrated column, no index
+    with engine.begin() as connection:
+        for column in ['source_username', 'priority', 'total_tracks', 'completed_tracks']:
+            connection.execute(text(f"ALTER TABLE albums DROP COLUMN {column}"))
+        connection.execute(text("ALTER TABLE album_source_candidates DROP COLUMN queue_length"))
+        for index in inspect(connection).get_indexes('tracks') + inspect(connection).get_indexes('albums'):
+            connection.execute(text(f"DROP INDEX {index['name']}"))
+        connection.execute(text("INSERT INTO artists (id, name) VALUES ('artist', 'Artist')"))
+        connection.execute(text("INSERT INTO albums (id, artist_id, title, status) VALUES ('album', 'artist', 'Album', 'downloading')"))
+        connection.execute(text("INSERT INTO tracks (id, album_id, title, status) VALUES ('t1', 'album', 'One', 'completed')"))
+        connection.execute(text("INSERT INTO tracks (id, album_id, title, status) VALUES ('t2', 'album', 'Two', 'pending')"))
+
+    run_migrations(engine, Base.metadata)
+
+    inspector = inspect(engine)
+    assert {'source_username', 'priority', 'total_tracks', 'completed_tracks'} <= {c['name'] for c in inspector.get_columns('albums')}
+    assert 'ix_tracks_album_id_status' in [index['name'] for index in inspector.get_indexes('tracks')]
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT priority, total_tracks, completed_tracks FROM albums")).one() == (0, 2, 1)
+
+def test_concurrent_runs_apply_each_migration_once(tmp_path):
+    engine = _engine(tmp_path)
+    errors = []
+
+    def migrate():
+        try:
+            run_migrations(engine, Base.metadata)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=migrate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert _versions(engine) == sorted(m['version'] for m in MIGRATIONS)
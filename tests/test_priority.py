@@ -0,0 +1,43 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app.database import Database
+from app.db import create_db_engine
+from app.migrate import run_migrations
+from app.models import Base
+
+def _album(album_id, priority=None):
+    album = {'id': album_id, 'title': album_id, 'tracks': [{'id': f"{album_id}-track", 'title': 'Track'}]}
+    if priority is not None:
+        album['priority'] = priority
+    return album
+
+def test_priority_column_is_added_to_existing_albums(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'lidseek.db'}")
+    Base.metadata.create_all(bind=engine)
+    # Schema of a release without download priorities
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE albums DROP COLUMN priority"))
+        connection.execute(text("ALTER TABLE album_source_candidates DROP COLUMN queue_length"))
+        connection.execute(text("INSERT INTO artists (id, name) VALUES ('artist', 'Artist')"))
+        connection.execute(text("INSERT INTO albums (id, artist_id, title, status) VALUES ('old', 'artist', 'old', 'pending')"))
+        connection.execute(text("INSERT INTO tracks (id, album_id, title, status) VALUES ('old-track', 'old', 'Track', 'pending')"))
+
+    run_migrations(engine)
+
+    columns = {column['name']: column for column in inspect(engine).get_columns('albums')}
+    assert not columns['priority']['nullable']
+    assert 'queue_length' in [column['name'] for column in inspect(engine).get_columns('album_source_candidates')]
+    sessions = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
+    database = Database(sessions)
+    database.upsert_albums('artist', 'Artist', [_album('urgent', 10), _album('later', -1)])
+    assert [album['id'] for album in database.get_pending_albums()] == ['urgent', 'old', 'later']
+    assert [album['priority'] for album in database.get_pending_albums()] == [10, 0, -1]
+    sessions.remove()
+    engine.dispose()
+
+def test_requeue_keeps_priority_unless_given(database):
+    database.upsert_albums('artist', 'Artist', [_album('album', 5)])
+    database.upsert_albums('artist', 'Artist', [_album('album')])
+    assert database.get_pending_albums()[0]['priority'] == 5
+    database.upsert_albums('artist', 'Artist', [_album('album', 1)])
+    assert database.get_pending_albums()[0]['priority'] == 1
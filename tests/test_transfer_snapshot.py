@@ -0,0 +1,42 @@
+from app.services.transfer_snapshot import TransferSnapshot
+
+def _download(username, *directories):
+    return {
+        'username': username,
+        'directories': [
+            {'directory': directory, 'files': [{'id': f"{username}-{directory}-{name}", 'filename': name} for name in names]}
+            for directory, names in directories
+        ]
+    }
+
+def _ids(files):
+    return [file['id'] for file in files]
+
+def test_folders_with_the_same_name_are_all_returned():
+    snapshot = TransferSnapshot([
+        _download('alice', ('@@music\\Artist\\Album', ['01.flac', '02.flac'])),
+        _download('bob', ('shared/artist/ALBUM', ['03.flac']))
+    ])
+    assert _ids(snapshot.find_directory_files('Album')) == [
+        'alice-@@music\\Artist\\Album-01.flac', 'alice-@@music\\Artist\\Album-02.flac', 'bob-shared/artist/ALBUM-03.flac'
+    ]
+    assert snapshot.directory_count == 2
+
+def test_partial_match_returns_first_folder_containing_the_name():
+    snapshot = TransferSnapshot([
+        _download('alice', ('music\\Other - Love Songs', ['a.flac'])),
+        _download('bob', ('music\\Artist - Café Society (2001) [FLAC]', ['b.flac'])),
+        _download('carol', ('music\\Artist - Cafe Society (Live)', ['c.flac']))
+    ])
+    assert _ids(snapshot.find_directory_files('Café Society')) == ['bob-music\\Artist - Café Society (2001) [FLAC]-b.flac']
+    # Words must all appear, in order, in the path
+    assert snapshot.find_directory_files('Society Cafe') == []
+    assert snapshot.find_directory_files('Unknown Album') == []
+    assert snapshot.find_directory_files('???') == []
+
+def test_exact_path_and_source_lookups():
+    snapshot = TransferSnapshot([_download('alice', ('music\\Album', ['01.flac']))])
+    assert snapshot.has_directory('music\\Album')
+    assert not snapshot.has_directory('music\\album')
+    assert _ids(snapshot.get_source_files('alice', 'music\\Album')) == ['alice-music\\Album-01.flac']
+    assert list(snapshot.iter_files()) == [('alice', {'id': 'alice-music\\Album-01.flac', 'filename': '01.flac'})]